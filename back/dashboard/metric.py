@@ -1,9 +1,30 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
 from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from dashboard.metrics_cache import get_metrics_cache, DASHBOARD_METRICS_CACHE_KEY
 
 router = APIRouter()
 
+# All dashboard aggregates in one round-trip; count(1) avoids materializing rows.
+# accuracy_rate is the share of finished processing jobs that completed.
+DASHBOARD_METRICS_SQL = text("""
+    SELECT
+        (SELECT COALESCE(SUM(rows_count), 0) FROM uploads) AS total_samples,
+        (SELECT count(1) FROM anomalies) AS anomalies_detected,
+        (
+            SELECT COALESCE(
+                count(1) FILTER (WHERE status = 'completed')::float
+                / NULLIF(count(1) FILTER (WHERE status IN ('completed', 'failed')), 0),
+                0.0
+            )
+            FROM processing_jobs
+        ) AS accuracy_rate
+""")
+
 
 class DashboardMetrics(BaseModel):
     """Response model for dashboard metrics"""
@@ -14,23 +35,31 @@ class DashboardMetrics(BaseModel):
 
 
 @router.get("/metrics", response_model=DashboardMetrics)
-def get_dashboard_metrics():
+async def get_dashboard_metrics(db: AsyncSession = Depends(get_db)):
     """
-    Get dashboard metrics including total samples, anomalies detected, 
+    Get dashboard metrics including total samples, anomalies detected,
     accuracy rate, and last update timestamp.
-    
+
+    Results are cached in memory for METRICS_CACHE_TTL_SECONDS and
+    invalidated whenever uploads or anomalies are written.
+
     Returns:
         DashboardMetrics: Current dashboard metrics
     """
-    # TODO: Replace with actual database queries
-    # Example:
-    # total_samples = db.query(Sample).count()
-    # anomalies_detected = db.query(Anomaly).count()
-    # accuracy_rate = calculate_model_accuracy()
-    
-    return DashboardMetrics(
-        total_samples=1500,
-        anomalies_detected=23,
-        accuracy_rate=0.94,
+    cache = get_metrics_cache()
+    cached_metrics = cache.get(DASHBOARD_METRICS_CACHE_KEY)
+    if cached_metrics is not None:
+        return cached_metrics
+
+    result = await db.execute(DASHBOARD_METRICS_SQL)
+    row = result.one()
+
+    metrics = DashboardMetrics(
+        total_samples=row.total_samples,
+        anomalies_detected=row.anomalies_detected,
+        accuracy_rate=row.accuracy_rate,
         last_updated=datetime.utcnow().isoformat() + "Z"
     )
+    cache.set(DASHBOARD_METRICS_CACHE_KEY, metrics)
+
+    return metrics
@@ -0,0 +1,76 @@
+"""
+In-process TTL cache for dashboard metrics
+Keeps aggregate query results in memory so repeated dashboard refreshes
+don't re-scan the uploads/anomalies tables on every request
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Cache configuration
+METRICS_CACHE_TTL_SECONDS = float(os.getenv("METRICS_CACHE_TTL_SECONDS", "30"))
+DASHBOARD_METRICS_CACHE_KEY = "dashboard:metrics:v1"
+
+
+class MetricsCache:
+    """Thread-safe key/value cache with per-entry expiry"""
+
+    def __init__(self, default_ttl: float = METRICS_CACHE_TTL_SECONDS):
+        self.default_ttl = default_ttl
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expiry_ts, value = entry
+            if time.monotonic() >= expiry_ts:
+                del self._entries[key]
+                return None
+
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a value in the cache
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Time to live in seconds (defaults to METRICS_CACHE_TTL_SECONDS)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key: str):
+        """
+        Drop a cached value so the next read recomputes it
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+# Singleton instance
+metrics_cache = MetricsCache()
+
+
+def get_metrics_cache() -> MetricsCache:
+    """Get the metrics cache singleton instance"""
+    return metrics_cache
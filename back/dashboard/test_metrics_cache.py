@@ -0,0 +1,108 @@
+"""
+Test script for the dashboard metrics cache
+Run this to verify cached metrics expire and invalidate correctly
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dashboard import metrics_cache
+from dashboard.metrics_cache import MetricsCache
+
+
+class _Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_expiry():
+    """Test that entries are served until their TTL and dropped after it"""
+    print("="*60)
+    print("Testing Metrics Cache - Expiry")
+    print("="*60)
+
+    original = metrics_cache.time.monotonic
+    clock = _Clock()
+    metrics_cache.time.monotonic = clock
+    try:
+        cache = MetricsCache(default_ttl=30)
+        cache.set("metrics", {"total_uploads": 3})
+        cache.set("short", "value", ttl=5)
+
+        clock.now += 4.9
+        assert cache.get("metrics") == {"total_uploads": 3}
+        assert cache.get("short") == "value"
+
+        clock.now += 0.1
+        assert cache.get("short") is None
+
+        clock.now += 25
+        assert cache.get("metrics") is None
+        assert cache.get("missing") is None
+
+        print("[OK] Entries expire after their TTL")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Expiry check failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        metrics_cache.time.monotonic = original
+
+
+def test_invalidate():
+    """Test that invalidate drops an entry and tolerates missing keys"""
+    print("\n" + "="*60)
+    print("Testing Metrics Cache - Invalidate")
+    print("="*60)
+
+    try:
+        cache = MetricsCache(default_ttl=30)
+        cache.set("metrics", {"total_uploads": 3})
+        cache.invalidate("metrics")
+        cache.invalidate("missing")
+        assert cache.get("metrics") is None
+
+        print("[OK] Invalidated entries are recomputed")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Invalidate check failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    print("\n[TEST] Starting Metrics Cache Tests\n")
+
+    results = []
+
+    # Run tests
+    results.append(("Expiry", test_expiry()))
+    results.append(("Invalidate", test_invalidate()))
+
+    # Summary
+    print("\n" + "="*60)
+    print("Test Summary")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "[OK] PASS" if passed else "[FAIL] FAIL"
+        print(f"{status} - {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n[SUCCESS] All tests passed! Metrics cache is ready.")
+    else:
+        print("\n[WARN] Some tests failed. Please check the errors above.")
+
+    sys.exit(0 if all_passed else 1)
@@ -1,10 +1,12 @@
 """Database package for Leak Detector backend"""
-from database.database import engine, SessionLocal, init_db, get_db, get_db_context, test_connection
+from database.database import engine, async_engine, SessionLocal, AsyncSessionLocal, init_db, get_db, get_db_context, test_connection
 from database.models import Base, Upload, Anomaly, Action, ProcessingJob
 
 __all__ = [
     "engine",
+    "async_engine",
     "SessionLocal",
+    "AsyncSessionLocal",
     "init_db",
     "get_db",
     "get_db_context",
@@ -2,12 +2,15 @@
 Database models for the Leak Detector application
 Using SQLAlchemy ORM for PostgreSQL
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, DECIMAL, Text, Index
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, DECIMAL, Text, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+from functools import cached_property
+
+from database.serialization import MSGPACK_AVAILABLE, unpack_feature_values
 
 Base = declarative_base()
 
@@ -37,6 +40,14 @@ class Upload(Base):
 class Anomaly(Base):
     """Stores detected anomalies from ML processing"""
     __tablename__ = "anomalies"
+    __table_args__ = (
+        Index('idx_anomalies_upload_id', 'upload_id'),
+        Index('idx_anomalies_severity', 'severity'),
+        Index('idx_anomalies_status', 'status'),
+        # Composite indexes for per-upload dashboard aggregations
+        Index('idx_anomalies_upload_status', 'upload_id', 'status'),
+        Index('idx_anomalies_upload_severity', 'upload_id', 'severity'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     upload_id = Column(UUID(as_uuid=True), ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False)
@@ -46,6 +57,9 @@ class Anomaly(Base):
     status = Column(String(50), default="unreviewed")  # unreviewed, reviewed, actioned
     timestamp = Column(DateTime(timezone=True))
     feature_values = Column(JSONB)  # Store all feature values as JSON
+    # Compact MessagePack alternative to feature_values; existing databases need
+    # the ALTER TABLE in schema.sql before this column can be queried
+    feature_values_msgpack = Column(LargeBinary)
     shap_values = Column(JSONB)  # Cached SHAP explanations
     model_prediction = Column(String(50))  # Classification result
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -59,11 +73,19 @@ class Anomaly(Base):
         return f"<Anomaly(id={self.id}, score={self.anomaly_score}, severity='{self.severity}')>"
 
     @property
+    def features(self):
+        """Feature values, decoded from MessagePack when stored in binary form (and msgpack is installed)"""
+        if self.feature_values_msgpack is not None and MSGPACK_AVAILABLE:
+            return unpack_feature_values(self.feature_values_msgpack)
+        return self.feature_values
+
+    @cached_property
     def severity_level(self):
-        """Calculate severity based on anomaly score"""
-        if float(self.anomaly_score) >= 0.8:
+        """Calculate severity based on anomaly score (computed once per instance)"""
+        score = float(self.anomaly_score)
+        if score >= 0.8:
             return "high"
-        elif float(self.anomaly_score) >= 0.5:
+        elif score >= 0.5:
             return "medium"
         else:
             return "low"
@@ -90,6 +112,9 @@ class Action(Base):
 class ProcessingJob(Base):
     """Tracks ML processing job status"""
     __tablename__ = "processing_jobs"
+    __table_args__ = (
+        Index('idx_jobs_upload_status', 'upload_id', 'status'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     upload_id = Column(UUID(as_uuid=True), ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False)
@@ -108,11 +133,3 @@ class ProcessingJob(Base):
     def __repr__(self):
         return f"<ProcessingJob(id={self.id}, status='{self.status}', progress={self.progress}%)>"
 
-
-# Indexes are defined in the schema.sql file
-# But can also be defined here using Index objects for reference
-__table_args__ = (
-    Index('idx_anomalies_upload_id', Anomaly.upload_id),
-    Index('idx_anomalies_severity', Anomaly.severity),
-    Index('idx_anomalies_status', Anomaly.status),
-)
@@ -41,12 +41,17 @@ CREATE TABLE anomalies (
     status VARCHAR(50) DEFAULT 'unreviewed', -- unreviewed, reviewed, actioned
     timestamp TIMESTAMP WITH TIME ZONE,
     feature_values JSONB, -- Store all feature values as JSON
+    feature_values_msgpack BYTEA, -- Compact MessagePack alternative to feature_values
     shap_values JSONB, -- Cached SHAP explanations
     model_prediction VARCHAR(50), -- Classification result if any
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- feature_values_msgpack was added after the first release; init_db's create_all
+-- doesn't alter existing tables, so on an existing database add it by hand:
+--   ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS feature_values_msgpack BYTEA;
+
 -- Indexes for performance
 CREATE INDEX idx_anomalies_upload_id ON anomalies(upload_id);
 CREATE INDEX idx_anomalies_severity ON anomalies(severity);
@@ -54,6 +59,12 @@ CREATE INDEX idx_anomalies_status ON anomalies(status);
 CREATE INDEX idx_anomalies_score ON anomalies(anomaly_score DESC);
 CREATE INDEX idx_anomalies_timestamp ON anomalies(timestamp DESC);
 
+-- Composite indexes for per-upload dashboard aggregations
+-- On an existing database, create them without locking writes:
+--   CREATE INDEX CONCURRENTLY idx_anomalies_upload_status ON anomalies(upload_id, status);
+CREATE INDEX idx_anomalies_upload_status ON anomalies(upload_id, status);
+CREATE INDEX idx_anomalies_upload_severity ON anomalies(upload_id, severity);
+
 -- GIN index for JSON queries
 CREATE INDEX idx_anomalies_feature_values ON anomalies USING GIN (feature_values);
 CREATE INDEX idx_anomalies_shap_values ON anomalies USING GIN (shap_values);
@@ -96,6 +107,7 @@ CREATE TABLE processing_jobs (
 -- Indexes
 CREATE INDEX idx_jobs_upload_id ON processing_jobs(upload_id);
 CREATE INDEX idx_jobs_status ON processing_jobs(status);
+CREATE INDEX idx_jobs_upload_status ON processing_jobs(upload_id, status);
 CREATE INDEX idx_jobs_created_at ON processing_jobs(created_at DESC);
 
 -- ========================================
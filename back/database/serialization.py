@@ -0,0 +1,74 @@
+"""
+Serialization for wide anomaly payloads
+MessagePack is optional; without it feature values stay in JSONB
+"""
+from typing import Any, Dict
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+
+def _encode_fallback(value: Any) -> Any:
+    """Convert values MessagePack can't encode natively (timestamps, numpy scalars)"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def jsonable_feature_values(feature_values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make a feature dictionary storable in a JSON/JSONB column
+    
+    Missing values (NaN, NaT) become None, since PostgreSQL rejects the NaN
+    token json.dumps emits; timestamps and numpy scalars are converted with
+    the same fallback MessagePack uses.
+    
+    Args:
+        feature_values: Mapping of feature name to value
+        
+    Returns:
+        Mapping of feature name to a JSON-native value
+    """
+    jsonable = {}
+    for name, value in feature_values.items():
+        if value is None or isinstance(value, (str, bool, int)):
+            jsonable[name] = value
+        elif value != value:  # NaN and NaT are the only values unequal to themselves
+            jsonable[name] = None
+        elif isinstance(value, float):
+            jsonable[name] = float(value)
+        else:
+            jsonable[name] = _encode_fallback(value)
+    return jsonable
+
+
+def pack_feature_values(feature_values: Dict[str, Any]) -> bytes:
+    """
+    Encode a feature dictionary as MessagePack bytes
+    
+    Args:
+        feature_values: Mapping of feature name to value
+        
+    Returns:
+        MessagePack-encoded bytes
+    """
+    return msgpack.packb(feature_values, use_bin_type=True, default=_encode_fallback)
+
+
+def unpack_feature_values(data: bytes) -> Dict[str, Any]:
+    """
+    Decode MessagePack bytes back into a feature dictionary
+    
+    Args:
+        data: Bytes produced by pack_feature_values
+        
+    Returns:
+        Mapping of feature name to value
+    """
+    return msgpack.unpackb(data, raw=False)
@@ -1,12 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from database import engine, async_engine, init_db, test_connection
+from ml_service import get_ml_service
+from storage import get_storage_service
 from dashboard.metric import router as dashboard_router
 from process.upload import router as upload_router
 from process.process import router as process_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """One-time startup/shutdown work, kept off the request path"""
+    # Startup: verify the database and create any missing tables
+    if test_connection():
+        init_db()
+    # Load ML models and trace the inference graph before serving requests.
+    # Missing or broken model files must not stop the API from booting; the
+    # service retries the load on first use
+    try:
+        get_ml_service().warmup()
+    except Exception as e:
+        print(f"[WARN] ML models not loaded at startup, will retry on first use: {e}")
+    yield
+    # Shutdown: release pooled connections and storage handles
+    await async_engine.dispose()
+    engine.dispose()
+    if get_storage_service.cache_info().currsize:
+        get_storage_service().close()
+        get_storage_service.cache_clear()
+
+
 app = FastAPI(
     title="Leak Detector API",
     description="Backend for ML-based financial anomaly detection",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Include routers
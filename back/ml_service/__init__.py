@@ -16,4 +16,36 @@ except ImportError as e:
     from ml_service.dummy_ml_service import process_upload_dummy as process_upload
     ML_SERVICE_MODE = "DUMMY"
 
-__all__ = ["MLService", "get_ml_service", "process_upload", "ML_SERVICE_MODE"]
+
+
+def __getattr__(name):
+    """Import bulk_insert_anomalies on first use so ML-only callers don't load the database stack"""
+    if name == "bulk_insert_anomalies":
+        from ml_service.persistence import bulk_insert_anomalies
+        return bulk_insert_anomalies
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def ml_service_dep() -> MLService:
+    """
+    FastAPI dependency for the ML service
+    
+    FastAPI caches dependency results per request, so every dependency that
+    declares Depends(ml_service_dep) shares the same instance within a request.
+    
+    Usage in FastAPI:
+        @router.post("/items")
+        async def create_item(ml: MLService = Depends(ml_service_dep)):
+            ...
+    """
+    return get_ml_service()
+
+
+__all__ = [
+    "MLService",
+    "get_ml_service",
+    "ml_service_dep",
+    "process_upload",
+    "bulk_insert_anomalies",
+    "ML_SERVICE_MODE",
+]
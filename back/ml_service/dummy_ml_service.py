@@ -4,8 +4,12 @@ Generates synthetic anomalies for testing purposes
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Any
-from datetime import datetime
+from typing import Dict, List, Sequence, Tuple, Any, Optional
+from collections import OrderedDict
+
+# Number of distinct upload schemas whose numeric columns are remembered
+NUMERIC_COLS_CACHE_SIZE = 32
+
 
 class DummyMLService:
     """
@@ -15,14 +19,22 @@ class DummyMLService:
     
     def __init__(self):
         self.models_loaded = False
-        print("⚠️ Using Dummy ML Service (TensorFlow not available)")
+        # Per-instance generator: avoids the global RandomState lock
+        self.rng = np.random.default_rng()
+        # (column, dtype) schema -> numeric column names, LRU-bounded
+        self._numeric_cols_cache = OrderedDict()
     
     def load_models(self):
         """Dummy model loading"""
         self.models_loaded = True
         print("✅ Dummy models loaded (synthetic data will be generated)")
     
-    def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def warmup(self):
+        """Dummy warmup, mirrors MLService.warmup"""
+        if not self.models_loaded:
+            self.load_models()
+    
+    def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
         """
         Minimal preprocessing for dummy service
         
@@ -30,113 +42,175 @@ class DummyMLService:
             df: Raw dataframe
             
         Returns:
-            Tuple of (original_df, dummy_scaled_df)
+            Tuple of (original_df, dummy scaled float32 matrix, feature_names)
         """
         # Just return original and a copy as "scaled"
         df_clean = df.copy()
         
         # Create dummy scaled features (just normalize numeric columns)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        df_scaled = df[numeric_cols].copy()
+        numeric_cols = self._numeric_columns(df)
+        values = df[numeric_cols].to_numpy(dtype=np.float32, na_value=np.nan)
         
-        # Simple min-max scaling
-        for col in df_scaled.columns:
-            min_val = df_scaled[col].min()
-            max_val = df_scaled[col].max()
-            if max_val > min_val:
-                df_scaled[col] = (df_scaled[col] - min_val) / (max_val - min_val)
+        # Simple min-max scaling, vectorized over all columns at once
+        if len(values):
+            min_vals = np.nanmin(values, axis=0)
+            value_range = np.nanmax(values, axis=0) - min_vals
+            value_range[value_range == 0] = 1.0
+            values = (values - min_vals) / value_range
         
-        return df_clean, df_scaled
+        return df_clean, values, numeric_cols
     
-    def detect_anomalies(
+    def _numeric_columns(self, df: pd.DataFrame) -> List[str]:
+        """
+        Get numeric column names, cached per schema so repeated uploads
+        with the same columns skip the dtype scan
+        
+        Args:
+            df: Raw dataframe
+            
+        Returns:
+            List of numeric column names
+        """
+        key = tuple(zip(df.columns, df.dtypes.astype(str)))
+        numeric_cols = self._numeric_cols_cache.get(key)
+        
+        if numeric_cols is None:
+            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            self._numeric_cols_cache[key] = numeric_cols
+            if len(self._numeric_cols_cache) > NUMERIC_COLS_CACHE_SIZE:
+                self._numeric_cols_cache.popitem(last=False)
+        else:
+            self._numeric_cols_cache.move_to_end(key)
+        
+        return numeric_cols
+    
+    def detect_anomalies_frame(
         self,
         df_original: pd.DataFrame,
-        df_scaled: pd.DataFrame,
+        X: np.ndarray,
         threshold: float = 0.5
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        Generate synthetic anomalies based on simple rules
+        Generate synthetic anomalies in columnar form
         
         Args:
             df_original: Original dataframe
-            df_scaled: Scaled features
+            X: Scaled features
             threshold: Anomaly threshold
             
         Returns:
-            List of anomaly dictionaries
+            Tuple of (anomalies_df, feature_values_df), row-aligned and
+            sorted by anomaly score descending
         """
-        anomalies = []
-        
         # Generate random anomalies (5-10% of data)
-        num_anomalies = int(len(df_original) * np.random.uniform(0.05, 0.10))
-        anomaly_indices = np.random.choice(len(df_original), num_anomalies, replace=False)
+        num_anomalies = int(len(df_original) * self.rng.uniform(0.05, 0.10))
+        # Pick rows by partitioning random weights: no full permutation is built
+        weights = self.rng.random(len(df_original), dtype=np.float32)
+        if len(weights):
+            anomaly_indices = np.argpartition(weights, num_anomalies)[:num_anomalies]
+        else:
+            anomaly_indices = np.empty(0, dtype=np.intp)
         
-        for idx in anomaly_indices:
-            row_data = df_original.iloc[idx]
-            
-            # Generate random anomaly score
-            score = np.random.uniform(threshold, 1.0)
-            
-            # Determine severity
-            if score >= 0.8:
-                severity = "high"
-            elif score >= 0.5:
-                severity = "medium"
-            else:
-                severity = "low"
-            
-            anomaly = {
-                "row_index": int(idx),
-                "anomaly_score": float(score),
-                "severity": severity,
-                "model_prediction": "anomaly" if score > 0.7 else "suspicious",
-                "reconstruction_error": float(score * 0.6),
-                "supervised_score": float(score * 0.4),
-                "timestamp": row_data.get('invoice_date', datetime.now()).isoformat() if 'invoice_date' in row_data else datetime.now().isoformat(),
-                "feature_values": row_data.to_dict(),
-                "shap_values": None
-            }
-            
-            anomalies.append(anomaly)
+        # Score all anomalies at once, sorted by score descending
+        scores = self.rng.uniform(threshold, 1.0, size=num_anomalies)
+        order = np.argsort(-scores)
+        anomaly_indices = anomaly_indices[order]
+        scores = scores[order]
+        
+        # Pull all flagged rows in one slice
+        feature_values_df = df_original.iloc[anomaly_indices].reset_index(drop=True)
+        
+        if 'invoice_date' in feature_values_df.columns:
+            timestamps = pd.to_datetime(feature_values_df['invoice_date'], errors='coerce')
+            timestamps = timestamps.fillna(pd.Timestamp.now())
+        else:
+            timestamps = pd.Series(pd.Timestamp.now(), index=feature_values_df.index)
         
-        # Sort by score descending
-        anomalies.sort(key=lambda x: x['anomaly_score'], reverse=True)
+        anomalies_df = pd.DataFrame({
+            "row_index": anomaly_indices,
+            "anomaly_score": scores,
+            "severity": np.where(scores >= 0.8, "high", np.where(scores >= 0.5, "medium", "low")),
+            "model_prediction": np.where(scores > 0.7, "anomaly", "suspicious"),
+            "reconstruction_error": scores * 0.6,
+            "supervised_score": scores * 0.4,
+            "timestamp": timestamps
+        })
         
-        print(f"✅ Dummy ML generated {len(anomalies)} synthetic anomalies")
-        return anomalies
+        print(f"✅ Dummy ML generated {len(anomalies_df)} synthetic anomalies")
+        return anomalies_df, feature_values_df
+    
+    def detect_anomalies(
+        self,
+        df_original: pd.DataFrame,
+        X: np.ndarray,
+        threshold: float = 0.5
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate synthetic anomalies based on simple rules
+        
+        Args:
+            df_original: Original dataframe
+            X: Scaled features
+            threshold: Anomaly threshold
+            
+        Returns:
+            List of anomaly dictionaries
+        """
+        anomalies_df, feature_values_df = self.detect_anomalies_frame(
+            df_original, X, threshold
+        )
+        return anomalies_to_records(anomalies_df, feature_values_df)
     
     def compute_shap_values(
         self,
-        df_scaled: pd.DataFrame,
+        X: np.ndarray,
         row_index: int,
+        feature_names: Sequence[str],
         background_samples: int = 100
     ) -> Dict[str, float]:
         """
         Generate dummy SHAP values
         
         Args:
-            df_scaled: Scaled features
+            X: Scaled features
             row_index: Row index
+            feature_names: Column names of X
             background_samples: Not used in dummy
             
         Returns:
             Dictionary of dummy SHAP values
         """
-        # Generate random SHAP values for available columns
-        shap_dict = {}
-        
-        for col in df_scaled.columns[:10]:  # Top 10 features
-            shap_dict[col] = float(np.random.uniform(-0.5, 0.5))
+        # Generate random SHAP values for available columns (top 10 features)
+        columns = np.asarray(feature_names[:10], dtype=object)
+        values = self.rng.uniform(-0.5, 0.5, size=columns.size)
         
         # Sort by absolute value
-        shap_dict = dict(sorted(
-            shap_dict.items(),
-            key=lambda item: abs(item[1]),
-            reverse=True
-        ))
+        order = np.argsort(-np.abs(values))
+        shap_dict = dict(zip(columns[order].tolist(), values[order].tolist()))
         
         return shap_dict
     
+    def compute_shap_values_batch(
+        self,
+        X: np.ndarray,
+        row_indices: Sequence[int],
+        feature_names: Sequence[str],
+        background_samples: int = 100
+    ) -> List[Dict[str, float]]:
+        """
+        Generate dummy SHAP values for several rows
+        
+        Args:
+            X: Scaled features
+            row_indices: Row indices
+            feature_names: Column names of X
+            background_samples: Not used in dummy
+            
+        Returns:
+            One dictionary of dummy SHAP values per row
+        """
+        return [self.compute_shap_values(X, idx, feature_names) for idx in row_indices]
+    
     def generate_summary(
         self,
         shap_values: Dict[str, float],
@@ -169,13 +243,41 @@ class DummyMLService:
         return summary
 
 
-# Export dummy service
-dummy_ml_service = DummyMLService()
+def anomalies_to_records(
+    anomalies_df: pd.DataFrame,
+    feature_values_df: pd.DataFrame
+) -> List[Dict[str, Any]]:
+    """
+    Materialize columnar anomaly results as per-anomaly dictionaries
+    
+    Args:
+        anomalies_df: One row per anomaly (scores, severity, timestamp, ...)
+        feature_values_df: Original feature rows, aligned with anomalies_df
+        
+    Returns:
+        List of anomaly dictionaries
+    """
+    records = anomalies_df.assign(
+        timestamp=anomalies_df["timestamp"].map(pd.Timestamp.isoformat)
+    ).to_dict(orient="records")
+    
+    for record, features in zip(records, feature_values_df.to_dict(orient="records")):
+        record["feature_values"] = features
+        record["shap_values"] = None
+    
+    return records
+
+
+# Dummy service instance, created on first use
+_instance: Optional[DummyMLService] = None
 
 
 def get_dummy_ml_service() -> DummyMLService:
     """Get dummy ML service instance"""
-    return dummy_ml_service
+    global _instance
+    if _instance is None:
+        _instance = DummyMLService()
+    return _instance
 
 
 # Convenience function
@@ -191,6 +293,6 @@ def process_upload_dummy(df: pd.DataFrame, threshold: float = 0.5) -> Tuple[pd.D
         Tuple of (cleaned_df, anomalies_list)
     """
     service = get_dummy_ml_service()
-    df_clean, df_scaled = service.preprocess_data(df)
-    anomalies = service.detect_anomalies(df_clean, df_scaled, threshold)
+    df_clean, X, _ = service.preprocess_data(df)
+    anomalies = service.detect_anomalies(df_clean, X, threshold)
     return df_clean, anomalies
@@ -3,10 +3,11 @@ ML Service for Leak Detection
 Handles model loading, preprocessing, anomaly detection, and SHAP explanations
 """
 import os
+import threading
 import joblib
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple, Any, Optional
 from pathlib import Path
 
 # Try different Keras/TensorFlow import methods
@@ -24,11 +25,133 @@ except ImportError:
         )
 
 import shap
+from sklearn.preprocessing import StandardScaler
 from datetime import datetime
+from collections import OrderedDict
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+from ml_service.tensorrt_engine import TensorRTAutoencoder, TENSORRT_AVAILABLE, TENSORRT_ENGINE_PATH
 
 # Path to ML models
 ML_MODELS_DIR = Path(__file__).parent.parent.parent / "ml"
 
+# Rows per autoencoder forward pass
+INFERENCE_BATCH_SIZE = int(os.getenv("ML_INFERENCE_BATCH_SIZE", "1024"))
+
+# Reduced-precision autoencoder inference: "auto" enables it only when a GPU is present
+ML_MIXED_PRECISION = os.getenv("ML_MIXED_PRECISION", "auto").lower()
+
+# Features per SHAP explanation that are ranked by importance
+SHAP_TOP_N = 10
+
+# Format of the date columns in billing CSVs; "ISO8601" takes dates with or without a time part
+DATE_FORMAT = os.getenv("ML_DATE_FORMAT", "ISO8601")
+
+# Raw CSV columns used as features
+NUMERIC_FEATURE_COLS = (
+    'invoice_amount', 'tax_amount', 'total_amount',
+    'discount_applied', 'refund_amount', 'retries',
+    'gateway_fee', 'usage_units', 'usage_cost', 'rounding_diff'
+)
+CATEGORICAL_FEATURE_COLS = (
+    'currency', 'payment_status', 'payment_method',
+    'subscription_plan', 'billing_cycle', 'country',
+    'failed_reason', 'system_version'
+)
+# Date-based features: (name, end column, start column)
+DATE_FEATURES = (
+    ('payment_delay_days', 'payment_date', 'invoice_date'),
+    ('due_delay_days', 'due_date', 'invoice_date'),
+)
+
+# Number of distinct upload schemas whose feature layout is remembered
+FEATURE_LAYOUT_CACHE_SIZE = 32
+
+
+class FeatureLayout(NamedTuple):
+    """Where each engineered feature of one upload schema goes in the feature matrix"""
+    numeric_cols: Tuple[str, ...]
+    date_features: Tuple[Tuple[str, str, str], ...]
+    categorical: Tuple[Tuple[str, pd.CategoricalDtype, np.ndarray], ...]  # (column, levels, dummy index per level or -1)
+    has_prorated: bool
+    has_tax_rate: bool
+    has_refund_rate: bool
+    column_names: List[str]
+    col_idx: Dict[str, int]
+
+
+def _use_mixed_precision() -> bool:
+    """Whether to run the autoencoder in float16 (float16 is slower than float32 on CPU)"""
+    if tf is None or ML_MIXED_PRECISION in ("0", "false", "off"):
+        return False
+    if ML_MIXED_PRECISION in ("1", "true", "on"):
+        return True
+    return bool(tf.config.list_physical_devices("GPU"))
+
+
+def _safe_ratio_numpy(numerator: np.ndarray, denominator: np.ndarray, out: np.ndarray):
+    """out = numerator / (denominator + 1e-6), with NaN results set to 0"""
+    np.divide(numerator, denominator + 1e-6, out=out)
+    out[np.isnan(out)] = 0.0
+
+
+if NUMBA_AVAILABLE:
+    # fastmath without 'nnan'/'ninf' so the NaN check is not optimized away
+    @njit(cache=True, parallel=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+    def _safe_ratio(numerator, denominator, out):
+        """out = numerator / (denominator + 1e-6), with NaN results set to 0"""
+        for i in prange(numerator.shape[0]):
+            value = numerator[i] / (denominator[i] + 1e-6)
+            out[i] = 0.0 if value != value else value
+else:
+    _safe_ratio = _safe_ratio_numpy
+
+
+def _parse_dates(values: pd.Series, name: str) -> pd.Series:
+    """
+    Parse a date column with DATE_FORMAT, falling back to format inference
+    
+    A column in another layout would otherwise coerce to all-NaT and silently
+    zero the date features, so that case is retried without a format and logged.
+    
+    Args:
+        values: Raw column values
+        name: Column name, for the log message
+        
+    Returns:
+        Datetime column; unparseable values are NaT
+    """
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce', cache=True)
+    if parsed.isna().all() and values.notna().any():
+        print(f"[WARN] {name} doesn't match date format {DATE_FORMAT!r}; inferring the format instead")
+        parsed = pd.to_datetime(values, errors='coerce', cache=True)
+    return parsed
+
+
+def _jsonable_values(values: pd.Series) -> List[Any]:
+    """
+    Convert one column's values to JSON-native Python objects
+    
+    Timestamps become ISO strings and missing values (NaN, NaT) become None,
+    so anomaly records can be stored in JSONB as they are.
+    
+    Args:
+        values: Column values
+        
+    Returns:
+        List of str, int, float, bool, or None
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return [None if ts is pd.NaT else ts.isoformat() for ts in values.tolist()]
+    if values.hasnans:
+        return values.astype(object).where(values.notna(), None).tolist()
+    return values.tolist()
+
 
 class MLService:
     """
@@ -37,17 +160,35 @@ class MLService:
     """
     
     _instance = None
-    _models_loaded = False
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(MLService, cls).__new__(cls)
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(MLService, cls).__new__(cls)
+                    instance._models_loaded = False
+                    instance._load_lock = threading.Lock()
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self):
-        if not self._models_loaded:
-            self.load_models()
-            self._models_loaded = True
+        self.warmup()
+    
+    def warmup(self):
+        """
+        Load models and trace the inference graph exactly once
+        
+        Safe to call from several threads: callers arriving while another
+        thread is loading wait for it instead of loading a second copy.
+        Called from the app's startup so the first request doesn't pay for it.
+        """
+        if self._models_loaded:
+            return
+        with self._load_lock:
+            if not self._models_loaded:
+                self.load_models()
+                self._models_loaded = True
     
     def load_models(self):
         """Load all ML models from disk"""
@@ -59,10 +200,36 @@ class MLService:
             self.scaler = joblib.load(scaler_path)
             print(f"  [OK] Scaler loaded (expects {self.scaler.n_features_in_} features)")
             
+            # Standardize with cached float32 statistics instead of scaler.transform
+            self._scaler_mean = None
+            self._scaler_scale = None
+            if isinstance(self.scaler, StandardScaler):
+                n_features = self.scaler.n_features_in_
+                self._scaler_mean = (
+                    self.scaler.mean_ if self.scaler.with_mean else np.zeros(n_features)
+                ).astype(np.float32)
+                self._scaler_scale = (
+                    self.scaler.scale_ if self.scaler.with_std else np.ones(n_features)
+                ).astype(np.float32)
+            
+            # Feature layout is frozen per upload schema from here on. A scaler
+            # fitted on a DataFrame names its training columns, which pins every
+            # feature (and category level) to the column it was trained on
+            self._n_features = self.scaler.n_features_in_
+            self._trained_feature_names = getattr(self.scaler, "feature_names_in_", None)
+            if self._trained_feature_names is not None:
+                self._trained_feature_names = [str(name) for name in self._trained_feature_names]
+                print("  [OK] Feature layout taken from the scaler's training columns")
+            else:
+                print("  [WARN] Scaler has no feature names; category levels are frozen from the first upload that has each column")
+            self._category_levels = {}
+            self._layout_cache = OrderedDict()
+            
             # Load supervised classifier
             supervised_path = ML_MODELS_DIR / "supervised_model.joblib"
             self.supervised_model = joblib.load(supervised_path)
             print(f"  [OK] Supervised model loaded: {type(self.supervised_model).__name__}")
+            self._scoring_fn = self._build_scoring_fn()
             
             # Load autoencoder
             autoencoder_path = ML_MODELS_DIR / "optimal_autoencoder_model.keras"
@@ -72,8 +239,32 @@ class MLService:
                 self.autoencoder = keras.models.load_model(autoencoder_path)
             print(f"  [OK] Autoencoder loaded: {self.autoencoder.input_shape}")
             
-            # Initialize SHAP explainer (lazy loading)
-            self.shap_explainer = None
+            if _use_mixed_precision():
+                self.autoencoder = self._to_mixed_precision(self.autoencoder)
+                print("  [OK] Autoencoder running in mixed precision (float16)")
+            
+            # Compile the forward pass once as a graph and trace it before serving
+            self._ae_infer = None
+            if tf is not None:
+                n_features = self.autoencoder.input_shape[-1]
+                self._ae_infer = tf.function(
+                    lambda x: self.autoencoder(x, training=False),
+                    input_signature=[tf.TensorSpec([None, n_features], tf.float32)]
+                )
+                self._ae_infer(tf.zeros((1, n_features), dtype=tf.float32))
+            
+            # Prefer a prebuilt TensorRT engine on GPU hosts, fall back to Keras
+            self._ae_infer_trt = None
+            if TENSORRT_AVAILABLE and TENSORRT_ENGINE_PATH.exists():
+                try:
+                    self._ae_infer_trt = TensorRTAutoencoder(TENSORRT_ENGINE_PATH, INFERENCE_BATCH_SIZE)
+                    print(f"  [OK] TensorRT engine loaded: {TENSORRT_ENGINE_PATH.name}")
+                except Exception as e:
+                    print(f"  [WARN] TensorRT engine unavailable, using Keras: {e}")
+            
+            # Build the SHAP explainer once; it is reused across uploads
+            self.shap_explainer = self._build_shap_explainer()
+            print(f"  [OK] SHAP explainer: {type(self.shap_explainer).__name__ if self.shap_explainer else 'KernelExplainer (lazy)'}")
             
             print("[OK] All ML models loaded successfully")
             
@@ -81,7 +272,92 @@ class MLService:
             print(f"[ERROR] Error loading ML models: {e}")
             raise e
     
-    def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def _to_mixed_precision(self, model):
+        """
+        Clone a float32 Keras model into the mixed_float16 policy
+        
+        Weights stay float32; matmuls run in float16 (TF32 where supported).
+        Reconstruction errors are only compared against a threshold, so the
+        reduced precision does not change which rows get flagged in practice.
+        
+        Args:
+            model: Loaded float32 Keras model
+            
+        Returns:
+            Equivalent model computing in float16
+        """
+        tf.config.experimental.enable_tensor_float_32_execution(True)
+        
+        mixed_model = tf.keras.models.clone_model(
+            model,
+            clone_function=lambda layer: layer.__class__.from_config(
+                {**layer.get_config(), "dtype": "mixed_float16"}
+            )
+        )
+        mixed_model.set_weights(model.get_weights())
+        return mixed_model
+    
+    def _build_scoring_fn(self) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Pick the cheapest way to get 1-D anomaly probabilities from the supervised model
+        
+        Binary XGBoost and LightGBM models are scored through their native boosters,
+        which return the class-1 probability directly instead of an (N, 2) matrix.
+        Any other model falls back to predict_proba.
+        
+        Returns:
+            Function mapping a feature matrix to one anomaly score per row
+        """
+        model = self.supervised_model
+        is_binary = len(getattr(model, "classes_", ())) == 2
+        
+        # XGBoost sklearn wrapper
+        if is_binary and hasattr(model, "get_booster") and getattr(model, "objective", None) == "binary:logistic":
+            booster = model.get_booster()
+            # Match predict_proba: stop at the early-stopping best iteration
+            # and treat the model's missing-value sentinel as missing
+            iteration_range = model._get_iteration_range(None)
+            missing = model.missing
+            return lambda X: booster.inplace_predict(X, iteration_range=iteration_range, missing=missing)
+        
+        # LightGBM sklearn wrapper
+        if is_binary and hasattr(model, "booster_"):
+            booster = model.booster_
+            return lambda X: booster.predict(X)
+        
+        def predict_proba_scores(X: np.ndarray) -> np.ndarray:
+            supervised_probs = model.predict_proba(X)
+            # Assuming class 1 is "anomaly"
+            if supervised_probs.shape[1] > 1:
+                return supervised_probs[:, 1]
+            return supervised_probs[:, 0]
+        
+        return predict_proba_scores
+    
+    def _build_shap_explainer(self):
+        """
+        Pick the fastest exact SHAP explainer the supervised model supports
+        
+        Tree ensembles (sklearn, XGBoost, LightGBM) get TreeExplainer and linear
+        models get LinearExplainer; both are built once at load time. Any other
+        model returns None and falls back to KernelExplainer on first use.
+        
+        Returns:
+            SHAP explainer, or None for the KernelExplainer fallback
+        """
+        try:
+            return shap.TreeExplainer(self.supervised_model)
+        except Exception:
+            pass
+        
+        if hasattr(self.supervised_model, "coef_"):
+            # Scaled features are zero-mean, so a zero row is the background
+            background_data = np.zeros((1, self.scaler.n_features_in_))
+            return shap.LinearExplainer(self.supervised_model, background_data)
+        
+        return None
+    
+    def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, List[str]]:
         """
         Preprocess raw CSV data for ML models
         
@@ -89,115 +365,232 @@ class MLService:
             df: Raw dataframe from CSV upload
             
         Returns:
-            Tuple of (original_df, processed_features)
+            Tuple of (original_df, scaled float32 feature matrix, feature_names)
         """
-        # Make a copy to avoid modifying original
-        df_clean = df.copy()
+        # Shallow copy: replaced date columns don't leak into the caller's
+        # frame, and no column data is duplicated
+        df_clean = df.copy(deep=False)
         
-        # Parse date columns
+        # Parse date columns (fixed ISO format, repeated dates parsed once)
         date_columns = ['invoice_date', 'due_date', 'payment_date']
         for col in date_columns:
             if col in df_clean.columns:
-                df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
+                df_clean[col] = _parse_dates(df_clean[col], col)
         
         # Feature engineering
-        features_df = self._engineer_features(df_clean)
+        X, feature_names = self._engineer_features(df_clean)
         
-        # Select only numeric features for scaling
-        numeric_features = features_df.select_dtypes(include=[np.number]).columns.tolist()
+        # Scale features in place, keeping the matrix in float32 for inference
+        if self._scaler_mean is not None:
+            X -= self._scaler_mean
+            X /= self._scaler_scale
+        else:
+            X = self.scaler.transform(X).astype(np.float32, copy=False)
         
-        # Scale features
-        scaled_features = self.scaler.transform(features_df[numeric_features])
+        return df_clean, X, feature_names
+    
+    def _feature_layout(self, df: pd.DataFrame) -> FeatureLayout:
+        """
+        Get the engineered-feature layout for an upload's columns, cached per schema
         
-        # Create scaled dataframe
-        scaled_df = pd.DataFrame(
-            scaled_features,
-            columns=numeric_features,
-            index=features_df.index
-        )
+        Args:
+            df: Cleaned dataframe
+            
+        Returns:
+            FeatureLayout for df's columns
+        """
+        key = tuple(df.columns)
+        layout = self._layout_cache.get(key)
+        
+        if layout is None:
+            layout = self._build_feature_layout(df)
+            self._layout_cache[key] = layout
+            if len(self._layout_cache) > FEATURE_LAYOUT_CACHE_SIZE:
+                self._layout_cache.popitem(last=False)
+        else:
+            self._layout_cache.move_to_end(key)
         
-        return df_clean, scaled_df
+        return layout
     
-    def _engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _build_feature_layout(self, df: pd.DataFrame) -> FeatureLayout:
         """
-        Feature engineering to match training data
-        Creates 55 features expected by the scaler
+        Work out which features an upload produces and where each one goes
+        
+        With the scaler's training column names, every feature and category
+        level goes to the column it was trained on, whatever the upload holds.
+        Without them, see _build_frozen_layout.
         
         Args:
             df: Cleaned dataframe
             
         Returns:
-            DataFrame with engineered features
+            FeatureLayout for df's columns
         """
-        features = pd.DataFrame(index=df.index)
+        if self._trained_feature_names is None:
+            return self._build_frozen_layout(df)
         
-        # Numeric features from CSV
-        numeric_cols = [
-            'invoice_amount', 'tax_amount', 'total_amount',
-            'discount_applied', 'refund_amount', 'retries',
-            'gateway_fee', 'usage_units', 'usage_cost', 'rounding_diff'
-        ]
+        column_names = list(self._trained_feature_names)
+        col_idx = {name: i for i, name in enumerate(column_names)}
         
-        for col in numeric_cols:
+        # Only features the model was trained on are written
+        numeric_cols = tuple(
+            col for col in NUMERIC_FEATURE_COLS if col in df.columns and col in col_idx
+        )
+        date_features = tuple(
+            (name, end, start)
+            for name, end, start in DATE_FEATURES
+            if end in df.columns and start in df.columns and name in col_idx
+        )
+        
+        # Levels are the trained dummy columns; any other value gets no dummy
+        categorical = []
+        for col in CATEGORICAL_FEATURE_COLS:
             if col in df.columns:
-                features[col] = df[col].fillna(0)
-        
-        # Date-based features
-        if 'invoice_date' in df.columns and 'payment_date' in df.columns:
-            features['payment_delay_days'] = (
-                df['payment_date'] - df['invoice_date']
-            ).dt.days.fillna(0)
-        
-        if 'invoice_date' in df.columns and 'due_date' in df.columns:
-            features['due_delay_days'] = (
-                df['due_date'] - df['invoice_date']
-            ).dt.days.fillna(0)
-        
-        # Categorical encoding (one-hot)
-        categorical_cols = [
-            'currency', 'payment_status', 'payment_method',
-            'subscription_plan', 'billing_cycle', 'country',
-            'failed_reason', 'system_version'
-        ]
+                prefix = f"{col}_"
+                dummy_cols = [i for i, name in enumerate(column_names) if name.startswith(prefix)]
+                if dummy_cols:
+                    levels = pd.CategoricalDtype([column_names[i][len(prefix):] for i in dummy_cols])
+                    categorical.append((col, levels, np.array(dummy_cols)))
+        
+        return FeatureLayout(
+            numeric_cols=numeric_cols,
+            date_features=date_features,
+            categorical=tuple(categorical),
+            has_prorated='is_prorated' in df.columns and 'is_prorated' in col_idx,
+            has_tax_rate='tax_rate' in col_idx and {'invoice_amount', 'tax_amount'} <= set(numeric_cols),
+            has_refund_rate='refund_rate' in col_idx and {'refund_amount', 'total_amount'} <= set(numeric_cols),
+            column_names=column_names,
+            col_idx=col_idx
+        )
+    
+    def _build_frozen_layout(self, df: pd.DataFrame) -> FeatureLayout:
+        """
+        Feature layout for a scaler fitted without column names
+        
+        Category levels are frozen the first time a categorical column is seen,
+        so later uploads in this process one-hot encode into the same columns.
+        The levels depend on which upload came first, so each freeze is logged.
+        
+        Args:
+            df: Cleaned dataframe
+            
+        Returns:
+            FeatureLayout for df's columns
+        """
+        numeric_cols = tuple(col for col in NUMERIC_FEATURE_COLS if col in df.columns)
+        
+        date_features = tuple(
+            (name, end, start)
+            for name, end, start in DATE_FEATURES
+            if end in df.columns and start in df.columns
+        )
         
-        for col in categorical_cols:
+        # One-hot columns with the first level dropped, like get_dummies(drop_first=True)
+        categorical = []
+        dummy_names = []
+        dummy_offset = len(numeric_cols) + len(date_features)
+        for col in CATEGORICAL_FEATURE_COLS:
             if col in df.columns:
-                # One-hot encode with prefix
-                dummies = pd.get_dummies(df[col], prefix=col, drop_first=True)
-                features = pd.concat([features, dummies], axis=1)
-        
-        # Boolean features
-        if 'is_prorated' in df.columns:
-            features['is_prorated'] = df['is_prorated'].fillna(0)
-        
-        # Derived features
-        if 'invoice_amount' in features and 'tax_amount' in features:
-            features['tax_rate'] = (
-                features['tax_amount'] / (features['invoice_amount'] + 1e-6)
-            ).fillna(0)
-        
-        if 'refund_amount' in features and 'total_amount' in features:
-            features['refund_rate'] = (
-                features['refund_amount'] / (features['total_amount'] + 1e-6)
-            ).fillna(0)
-        
-        # Ensure we have at least 55 features (pad with zeros if needed)
-        expected_features = self.scaler.n_features_in_
-        current_features = len(features.columns)
-        
-        if current_features < expected_features:
-            for i in range(current_features, expected_features):
-                features[f'feature_{i}'] = 0
-        elif current_features > expected_features:
-            # Take only the first expected_features columns
-            features = features.iloc[:, :expected_features]
-        
-        return features
+                if col not in self._category_levels:
+                    self._category_levels[col] = pd.CategoricalDtype(pd.Categorical(df[col]).categories)
+                    print(f"[WARN] Freezing {col} levels from this upload: {list(self._category_levels[col].categories)}")
+                levels = self._category_levels[col]
+                first = dummy_offset + len(dummy_names)
+                # The dropped first level has no dummy column
+                dummy_cols = np.concatenate(([-1], np.arange(first, first + len(levels.categories) - 1)))
+                categorical.append((col, levels, dummy_cols))
+                dummy_names.extend(f"{col}_{level}" for level in levels.categories[1:])
+        
+        has_prorated = 'is_prorated' in df.columns
+        has_tax_rate = 'invoice_amount' in numeric_cols and 'tax_amount' in numeric_cols
+        has_refund_rate = 'refund_amount' in numeric_cols and 'total_amount' in numeric_cols
+        
+        column_names = (
+            list(numeric_cols)
+            + [name for name, _, _ in date_features]
+            + dummy_names
+            + (['is_prorated'] if has_prorated else [])
+            + (['tax_rate'] if has_tax_rate else [])
+            + (['refund_rate'] if has_refund_rate else [])
+        )
+        col_idx = {name: i for i, name in enumerate(column_names)}
+        
+        # Pad with zero columns up to the number of features the scaler expects
+        column_names += [f'feature_{i}' for i in range(len(column_names), self._n_features)]
+        
+        return FeatureLayout(
+            numeric_cols=numeric_cols,
+            date_features=date_features,
+            categorical=tuple(categorical),
+            has_prorated=has_prorated,
+            has_tax_rate=has_tax_rate,
+            has_refund_rate=has_refund_rate,
+            column_names=column_names,
+            col_idx=col_idx
+        )
+    
+    def _engineer_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+        """
+        Feature engineering to match training data
+        Creates 55 features expected by the scaler
+        
+        The column layout comes from the per-schema cache, then every feature
+        is written into one preallocated float32 matrix (no per-column concat copies).
+        
+        Args:
+            df: Cleaned dataframe
+            
+        Returns:
+            Tuple of (float32 feature matrix, feature_names)
+        """
+        layout = self._feature_layout(df)
+        col_idx = layout.col_idx
+        features = np.zeros((len(df), len(layout.column_names)), dtype=np.float32)
+        
+        for col in layout.numeric_cols:
+            features[:, col_idx[col]] = df[col].to_numpy(dtype=np.float32, na_value=0)
+        
+        for name, end, start in layout.date_features:
+            features[:, col_idx[name]] = (df[end] - df[start]).dt.days.to_numpy(dtype=np.float32, na_value=0)
+        
+        # Integer category codes index each level's dummy column; columns that
+        # already carry the layout's category dtype are used without re-hashing.
+        # Unknown levels (code -1) and levels without a column (-1) get no dummy
+        for col, levels, dummy_cols in layout.categorical:
+            codes = df[col].astype(levels, copy=False).cat.codes.to_numpy()
+            rows = np.nonzero(codes >= 0)[0]
+            cols = dummy_cols[codes[rows]]
+            hit = cols >= 0
+            features[rows[hit], cols[hit]] = 1.0
+        
+        if layout.has_prorated:
+            features[:, col_idx['is_prorated']] = df['is_prorated'].to_numpy(dtype=np.float32, na_value=0)
+        
+        # Derived features, written straight into their matrix columns
+        if layout.has_tax_rate:
+            _safe_ratio(
+                features[:, col_idx['tax_amount']],
+                features[:, col_idx['invoice_amount']],
+                features[:, col_idx['tax_rate']]
+            )
+        
+        if layout.has_refund_rate:
+            _safe_ratio(
+                features[:, col_idx['refund_amount']],
+                features[:, col_idx['total_amount']],
+                features[:, col_idx['refund_rate']]
+            )
+        
+        # Take only the first expected_features columns
+        return (
+            np.ascontiguousarray(features[:, :self._n_features]),
+            layout.column_names[:self._n_features]
+        )
     
     def detect_anomalies(
         self,
         df_original: pd.DataFrame,
-        df_scaled: pd.DataFrame,
+        X: np.ndarray,
         threshold: float = 0.5
     ) -> List[Dict[str, Any]]:
         """
@@ -205,129 +598,216 @@ class MLService:
         
         Args:
             df_original: Original dataframe with raw data
-            df_scaled: Scaled features dataframe
+            X: Scaled float32 feature matrix from preprocess_data
             threshold: Anomaly score threshold (0.0 to 1.0)
             
         Returns:
             List of anomaly dictionaries with metadata
         """
-        anomalies = []
-        
         # 1. Autoencoder reconstruction error
-        X = df_scaled.values
-        reconstructed = self.autoencoder.predict(X, verbose=0)
-        reconstruction_errors = np.mean(np.square(X - reconstructed), axis=1)
+        reconstruction_errors = self._reconstruction_errors(X)
         
-        # Normalize reconstruction errors to 0-1 range
+        # Normalize reconstruction errors to 0-1 range (folded into step 3)
         max_error = np.max(reconstruction_errors)
-        if max_error > 0:
-            reconstruction_scores = reconstruction_errors / max_error
-        else:
-            reconstruction_scores = reconstruction_errors
+        error_scale = 1.0 / max_error if max_error > 0 else 1.0
         
         # 2. Supervised model predictions
-        supervised_probs = self.supervised_model.predict_proba(X)
-        # Assuming class 1 is "anomaly"
-        if supervised_probs.shape[1] > 1:
-            supervised_scores = supervised_probs[:, 1]
-        else:
-            supervised_scores = supervised_probs[:, 0]
+        supervised_scores = self._scoring_fn(X)
         
-        # 3. Combine scores (weighted average)
-        combined_scores = 0.6 * reconstruction_scores + 0.4 * supervised_scores
+        # 3. Combine scores (weighted average):
+        #    0.6 * errors / max_error + 0.4 * supervised = 0.4 * (1.5 * errors / max_error + supervised)
+        #    built in one float32 buffer, without a temporary per operator
+        combined_scores = np.multiply(reconstruction_errors, 1.5 * error_scale, dtype=np.float32)
+        np.add(combined_scores, supervised_scores, out=combined_scores, casting="same_kind")
+        combined_scores *= 0.4
         
         # 4. Identify anomalies above threshold
         anomaly_indices = np.where(combined_scores >= threshold)[0]
         
-        for idx in anomaly_indices:
-            row_data = df_original.iloc[idx]
-            
-            # Determine severity based on score
-            score = float(combined_scores[idx])
-            if score >= 0.8:
-                severity = "high"
-            elif score >= 0.5:
-                severity = "medium"
-            else:
-                severity = "low"
-            
-            # Get model prediction
-            prediction = self.supervised_model.predict(df_scaled.iloc[idx:idx+1])[0]
-            
-            anomaly = {
-                "row_index": int(idx),
+        # Class predictions for the flagged rows in one call
+        if len(anomaly_indices):
+            predictions = self.supervised_model.predict(X[anomaly_indices])
+        else:
+            predictions = np.empty(0, dtype=object)
+        
+        # Gather per-anomaly columns in bulk
+        scores = combined_scores[anomaly_indices]
+        severities = np.where(scores >= 0.8, "high", np.where(scores >= 0.5, "medium", "low"))
+        # Gather each column's flagged values once, then zip them into row dicts
+        # (no per-row Series boxing as with DataFrame.to_dict(orient="records"))
+        columns = df_original.columns.tolist()
+        column_values = {
+            col: _jsonable_values(df_original[col].take(anomaly_indices))
+            for col in columns
+        }
+        feature_values = [
+            dict(zip(columns, row_values))
+            for row_values in zip(*column_values.values())
+        ]
+        
+        now = datetime.now().isoformat()
+        if 'invoice_date' in column_values:
+            timestamps = [
+                now if ts is None else ts
+                for ts in column_values['invoice_date']
+            ]
+        else:
+            timestamps = [now] * len(anomaly_indices)
+        
+        anomalies = [
+            {
+                "row_index": idx,
                 "anomaly_score": score,
                 "severity": severity,
                 "model_prediction": str(prediction),
-                "reconstruction_error": float(reconstruction_errors[idx]),
-                "supervised_score": float(supervised_scores[idx]),
-                "timestamp": row_data.get('invoice_date', datetime.now()).isoformat() if 'invoice_date' in row_data else datetime.now().isoformat(),
-                "feature_values": row_data.to_dict(),
+                "reconstruction_error": reconstruction_error,
+                "supervised_score": supervised_score,
+                "timestamp": timestamp,
+                "feature_values": features,
                 "shap_values": None  # Will be computed on-demand
             }
-            
-            anomalies.append(anomaly)
+            for idx, score, severity, prediction, reconstruction_error, supervised_score, timestamp, features in zip(
+                anomaly_indices.tolist(),
+                scores.tolist(),
+                severities.tolist(),
+                predictions.tolist(),
+                reconstruction_errors[anomaly_indices].tolist(),
+                supervised_scores[anomaly_indices].tolist(),
+                timestamps,
+                feature_values
+            )
+        ]
         
         return anomalies
     
+    def _reconstruction_errors(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per-row mean squared reconstruction error, computed batch by batch
+        
+        Args:
+            X: Scaled features as a float32 array
+            
+        Returns:
+            Array of reconstruction errors, one per row
+        """
+        errors = np.empty(len(X), dtype=np.float32)
+        
+        for start in range(0, len(X), INFERENCE_BATCH_SIZE):
+            batch = X[start:start + INFERENCE_BATCH_SIZE]
+            if self._ae_infer_trt is not None:
+                reconstructed = self._ae_infer_trt(batch)
+            elif self._ae_infer is not None:
+                # Upcast so the error math stays in float32 under mixed precision
+                reconstructed = self._ae_infer(tf.constant(batch)).numpy().astype(np.float32, copy=False)
+            else:
+                reconstructed = self.autoencoder.predict(batch, verbose=0)
+            errors[start:start + len(batch)] = np.mean(np.square(batch - reconstructed), axis=1)
+        
+        return errors
+    
     def compute_shap_values(
         self,
-        df_scaled: pd.DataFrame,
+        X: np.ndarray,
         row_index: int,
-        background_samples: int = 100
+        feature_names: Sequence[str],
+        background_samples: int = 100,
+        top_n: int = SHAP_TOP_N
     ) -> Dict[str, float]:
         """
         Compute SHAP values for a specific anomaly
         
         Args:
-            df_scaled: Scaled features dataframe
+            X: Scaled float32 feature matrix
             row_index: Index of the row to explain
+            feature_names: Column names of X
+            background_samples: Number of background samples for SHAP
+            top_n: Number of leading features ranked by absolute SHAP value
+            
+        Returns:
+            Dictionary mapping feature names to SHAP values, top_n most
+            important first, the rest in column order
+        """
+        shap_dicts = self.compute_shap_values_batch(
+            X, [row_index], feature_names, background_samples, top_n
+        )
+        return shap_dicts[0] if shap_dicts else {}
+    
+    def compute_shap_values_batch(
+        self,
+        X: np.ndarray,
+        row_indices: Sequence[int],
+        feature_names: Sequence[str],
+        background_samples: int = 100,
+        top_n: int = SHAP_TOP_N
+    ) -> List[Dict[str, float]]:
+        """
+        Compute SHAP values for many anomalies in one explainer call
+        
+        Args:
+            X: Scaled float32 feature matrix
+            row_indices: Indices of the rows to explain
+            feature_names: Column names of X
             background_samples: Number of background samples for SHAP
+            top_n: Number of leading features ranked by absolute SHAP value
             
         Returns:
-            Dictionary mapping feature names to SHAP values
+            One dictionary per row mapping feature names to SHAP values,
+            top_n most important first, the rest in column order
+            (empty list on failure)
         """
+        if len(row_indices) == 0:
+            return []
+        
         try:
-            # Initialize SHAP explainer if not already done
+            # Model-agnostic fallback needs background rows from real data
             if self.shap_explainer is None:
-                # Use a subset of data as background
-                background_data = df_scaled.sample(
-                    n=min(background_samples, len(df_scaled)),
-                    random_state=42
-                ).values
+                background_rows = np.random.default_rng(42).choice(
+                    len(X), size=min(background_samples, len(X)), replace=False
+                )
+                background_data = X[background_rows]
                 
                 self.shap_explainer = shap.KernelExplainer(
                     self.supervised_model.predict_proba,
                     background_data
                 )
             
-            # Get SHAP values for the specific row
-            row_data = df_scaled.iloc[row_index:row_index+1].values
-            shap_values = self.shap_explainer.shap_values(row_data)
+            # Explain all requested rows at once
+            rows = X[np.asarray(row_indices, dtype=np.intp)]
+            shap_values = self.shap_explainer.shap_values(rows)
             
             # If binary classification, take class 1 (anomaly) SHAP values
             if isinstance(shap_values, list):
                 shap_values = shap_values[1]
+            elif np.ndim(shap_values) == 3:
+                shap_values = shap_values[..., 1]
+            shap_values = np.asarray(shap_values)
             
-            # Map to feature names
-            feature_names = df_scaled.columns.tolist()
-            shap_dict = {
-                feature_names[i]: float(shap_values[0][i])
-                for i in range(len(feature_names))
-            }
+            # Rank only the top_n features per row: partial selection, then
+            # a sort of just those columns
+            abs_values = np.abs(shap_values)
+            n_top = min(top_n, abs_values.shape[1])
+            if 0 < n_top < abs_values.shape[1]:
+                top = np.argpartition(-abs_values, n_top - 1, axis=1)[:, :n_top]
+            else:
+                top = np.broadcast_to(np.arange(n_top), (len(abs_values), n_top))
+            top_order = np.argsort(-np.take_along_axis(abs_values, top, axis=1), axis=1, kind="stable")
+            top = np.take_along_axis(top, top_order, axis=1)
             
-            # Sort by absolute value
-            shap_dict = dict(sorted(
-                shap_dict.items(),
-                key=lambda item: abs(item[1]),
-                reverse=True
-            ))
+            # Map to feature names: ranked features first; update() keeps their
+            # positions and appends the remaining features in column order
+            feature_names = np.asarray(feature_names, dtype=object)
+            all_names = feature_names.tolist()
+            shap_dicts = []
+            for row_top, row_values in zip(top, shap_values):
+                shap_dict = dict(zip(feature_names[row_top].tolist(), row_values[row_top].tolist()))
+                shap_dict.update(zip(all_names, row_values.tolist()))
+                shap_dicts.append(shap_dict)
             
-            return shap_dict
+            return shap_dicts
             
         except Exception as e:
             print(f"⚠️ SHAP computation failed: {e}")
-            return {}
+            return []
     
     def generate_summary(
         self,
@@ -367,28 +847,39 @@ class MLService:
         return summary
 
 
-# Singleton instance
-ml_service = MLService()
-
-
 # Helper functions for easy access
 def get_ml_service() -> MLService:
-    """Get the ML service singleton instance"""
-    return ml_service
+    """Get the ML service singleton instance, loading models on first use"""
+    return MLService()
 
 
-def process_upload(df: pd.DataFrame, threshold: float = 0.5) -> Tuple[pd.DataFrame, List[Dict]]:
+def process_upload(
+    df: pd.DataFrame,
+    threshold: float = 0.5,
+    explain: bool = False
+) -> Tuple[pd.DataFrame, List[Dict]]:
     """
     Convenience function to process an uploaded CSV
     
     Args:
         df: Raw CSV dataframe
         threshold: Anomaly detection threshold
+        explain: Also attach SHAP values to every anomaly (one batched call)
         
     Returns:
         Tuple of (cleaned_df, anomalies_list)
     """
     service = get_ml_service()
-    df_clean, df_scaled = service.preprocess_data(df)
-    anomalies = service.detect_anomalies(df_clean, df_scaled, threshold)
+    df_clean, X, feature_names = service.preprocess_data(df)
+    anomalies = service.detect_anomalies(df_clean, X, threshold)
+    
+    if explain and anomalies:
+        shap_dicts = service.compute_shap_values_batch(
+            X,
+            [anomaly["row_index"] for anomaly in anomalies],
+            feature_names
+        )
+        for anomaly, shap_dict in zip(anomalies, shap_dicts):
+            anomaly["shap_values"] = shap_dict
+    
     return df_clean, anomalies
@@ -0,0 +1,93 @@
+"""
+Persistence helpers for ML results
+Writes detected anomalies to the database in bulk
+"""
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Union
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database import Anomaly
+from database.serialization import MSGPACK_AVAILABLE, jsonable_feature_values, pack_feature_values
+from dashboard.metrics_cache import get_metrics_cache, DASHBOARD_METRICS_CACHE_KEY
+
+# Keys of an anomaly dictionary that map onto columns of the anomalies table
+ANOMALY_COLUMNS = (
+    "row_index",
+    "anomaly_score",
+    "severity",
+    "timestamp",
+    "feature_values",
+    "shap_values",
+    "model_prediction",
+)
+
+# Storage format for feature values: "jsonb" (queryable) or "msgpack" (compact BYTEA)
+FEATURE_VALUES_FORMAT = os.getenv("FEATURE_VALUES_FORMAT", "jsonb")
+
+
+def build_anomaly_rows(
+    upload_id: Union[str, uuid.UUID],
+    anomalies: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Turn anomaly dictionaries into parameter sets for the anomalies table
+
+    Args:
+        upload_id: UUID of the upload the anomalies belong to
+        anomalies: Anomaly dictionaries from detect_anomalies
+
+    Returns:
+        One column -> value dictionary per anomaly
+    """
+    upload_uuid = uuid.UUID(str(upload_id))
+    pack_features = FEATURE_VALUES_FORMAT == "msgpack" and MSGPACK_AVAILABLE
+    rows = []
+    for anomaly in anomalies:
+        row = {col: anomaly[col] for col in ANOMALY_COLUMNS if col in anomaly}
+        if isinstance(row.get("timestamp"), str):
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        if "feature_values" in row:
+            if pack_features:
+                row["feature_values_msgpack"] = pack_feature_values(row.pop("feature_values"))
+            else:
+                row["feature_values"] = jsonable_feature_values(row["feature_values"])
+        row["upload_id"] = upload_uuid
+        rows.append(row)
+    return rows
+
+
+def bulk_insert_anomalies(
+    db: Session,
+    upload_id: Union[str, uuid.UUID],
+    anomalies: List[Dict[str, Any]]
+) -> int:
+    """
+    Insert all detected anomalies for an upload in one statement
+
+    Uses a Core insert with a list of parameter sets, which SQLAlchemy sends
+    as batched multi-row INSERT ... VALUES (like psycopg2's execute_values)
+    instead of one ORM flush per anomaly.
+
+    Args:
+        db: Database session
+        upload_id: UUID of the upload the anomalies belong to
+        anomalies: Anomaly dictionaries from detect_anomalies
+
+    Returns:
+        Number of anomalies inserted
+    """
+    if not anomalies:
+        return 0
+
+    rows = build_anomaly_rows(upload_id, anomalies)
+    db.execute(insert(Anomaly), rows)
+    db.commit()
+
+    # New anomalies change the dashboard totals
+    get_metrics_cache().invalidate(DASHBOARD_METRICS_CACHE_KEY)
+
+    return len(rows)
@@ -0,0 +1,143 @@
+"""
+TensorRT runtime for the autoencoder
+Optional GPU fast path: the Keras model is exported once to ONNX and built
+into a TensorRT engine, which MLService uses instead of Keras when available
+
+Build the engine (needs tf2onnx and TensorRT's trtexec on the GPU host):
+    cd back
+    python -m ml_service.tensorrt_engine
+"""
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import tensorrt as trt
+    import pycuda.driver as cuda
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    trt = None
+    cuda = None
+    TENSORRT_AVAILABLE = False
+
+# Path to ML models
+ML_MODELS_DIR = Path(__file__).parent.parent.parent / "ml"
+ONNX_MODEL_PATH = ML_MODELS_DIR / "optimal_autoencoder_model.onnx"
+TENSORRT_ENGINE_PATH = Path(os.getenv("TENSORRT_ENGINE_PATH", str(ML_MODELS_DIR / "ae.plan")))
+
+# Name of the engine's input tensor (set at ONNX export)
+INPUT_TENSOR_NAME = "input"
+
+
+class TensorRTAutoencoder:
+    """
+    Autoencoder forward pass backed by a serialized TensorRT engine
+    Keeps one execution context plus pinned host / device buffers sized
+    for the largest batch, so inference does no per-call allocation
+    """
+
+    def __init__(self, plan_path: Path, max_batch_size: int):
+        cuda.init()
+        self._cuda_context = cuda.Device(0).retain_primary_context()
+        self._lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+
+        self._cuda_context.push()
+        try:
+            logger = trt.Logger(trt.Logger.WARNING)
+            with open(plan_path, "rb") as f:
+                self.engine = trt.Runtime(logger).deserialize_cuda_engine(f.read())
+            self.context = self.engine.create_execution_context()
+            self.stream = cuda.Stream()
+
+            self.input_name = self.engine.get_tensor_name(0)
+            self.output_name = self.engine.get_tensor_name(1)
+            n_features = self.engine.get_tensor_shape(self.input_name)[-1]
+
+            self.host_input = cuda.pagelocked_empty((max_batch_size, n_features), np.float32)
+            self.host_output = cuda.pagelocked_empty((max_batch_size, n_features), np.float32)
+            self.device_input = cuda.mem_alloc(self.host_input.nbytes)
+            self.device_output = cuda.mem_alloc(self.host_output.nbytes)
+            self.context.set_tensor_address(self.input_name, int(self.device_input))
+            self.context.set_tensor_address(self.output_name, int(self.device_output))
+        finally:
+            self._cuda_context.pop()
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Reconstruct a batch of rows
+
+        Args:
+            batch: float32 array of shape (n_rows, n_features), n_rows <= max_batch_size
+
+        Returns:
+            Reconstructed rows as a float32 array
+        """
+        n_rows = len(batch)
+
+        # One shared context and buffer set: serialize callers
+        with self._lock:
+            self._cuda_context.push()
+            try:
+                self.host_input[:n_rows] = batch
+                self.context.set_input_shape(self.input_name, batch.shape)
+                cuda.memcpy_htod_async(self.device_input, self.host_input[:n_rows], self.stream)
+                self.context.execute_async_v3(self.stream.handle)
+                cuda.memcpy_dtoh_async(self.host_output[:n_rows], self.device_output, self.stream)
+                self.stream.synchronize()
+                return self.host_output[:n_rows].copy()
+            finally:
+                self._cuda_context.pop()
+
+
+def build_engine(
+    model,
+    max_batch_size: int,
+    onnx_path: Path = ONNX_MODEL_PATH,
+    plan_path: Path = TENSORRT_ENGINE_PATH
+):
+    """
+    Export a Keras autoencoder to ONNX and build an FP16 TensorRT engine
+
+    Args:
+        model: Loaded Keras autoencoder
+        max_batch_size: Largest batch the engine must accept
+        onnx_path: Where to write the ONNX model
+        plan_path: Where to write the serialized engine
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    n_features = model.input_shape[-1]
+    input_signature = (tf.TensorSpec((None, n_features), tf.float32, name=INPUT_TENSOR_NAME),)
+    tf2onnx.convert.from_keras(
+        model,
+        input_signature=input_signature,
+        opset=17,
+        output_path=str(onnx_path)
+    )
+    print(f"[OK] ONNX model written: {onnx_path}")
+
+    subprocess.run(
+        [
+            "trtexec",
+            f"--onnx={onnx_path}",
+            "--fp16",
+            f"--saveEngine={plan_path}",
+            f"--minShapes={INPUT_TENSOR_NAME}:1x{n_features}",
+            f"--optShapes={INPUT_TENSOR_NAME}:{max_batch_size}x{n_features}",
+            f"--maxShapes={INPUT_TENSOR_NAME}:{max_batch_size}x{n_features}",
+        ],
+        check=True
+    )
+    print(f"[OK] TensorRT engine written: {plan_path}")
+
+
+if __name__ == "__main__":
+    import tensorflow as tf
+
+    autoencoder = tf.keras.models.load_model(ML_MODELS_DIR / "optimal_autoencoder_model.keras")
+    build_engine(autoencoder, int(os.getenv("ML_INFERENCE_BATCH_SIZE", "1024")))
@@ -9,7 +9,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-from ml_service import get_ml_service
+from ml_service import get_ml_service, ML_SERVICE_MODE
 
 def test_model_loading():
     """Test that all models load successfully"""
@@ -42,11 +42,11 @@ def test_preprocessing():
         df_sample = df.head(100)
         
         service = get_ml_service()
-        df_clean, df_scaled = service.preprocess_data(df_sample)
+        df_clean, X, feature_names = service.preprocess_data(df_sample)
         
         print(f"[OK] Preprocessing successful")
         print(f"   - Cleaned data: {df_clean.shape}")
-        print(f"   - Scaled features: {df_scaled.shape}")
+        print(f"   - Scaled features: {X.shape} ({X.dtype})")
         print(f"   - Expected features: {service.scaler.n_features_in_}")
         
         return True
@@ -69,10 +69,10 @@ def test_anomaly_detection():
         df = pd.read_csv(csv_path).head(100)
         
         service = get_ml_service()
-        df_clean, df_scaled = service.preprocess_data(df)
+        df_clean, X, feature_names = service.preprocess_data(df)
         
         # Detect anomalies with threshold 0.5
-        anomalies = service.detect_anomalies(df_clean, df_scaled, threshold=0.5)
+        anomalies = service.detect_anomalies(df_clean, X, threshold=0.5)
         
         print(f"[OK] Anomaly detection successful")
         print(f"   - Anomalies found: {len(anomalies)}")
@@ -93,6 +93,85 @@ def test_anomaly_detection():
         return False
 
 
+def test_datetime_columns():
+    """Test that date columns with a time part parse like plain dates"""
+    print("\n" + "="*60)
+    print("Testing ML Service - Date Columns With Time")
+    print("="*60)
+    
+    if ML_SERVICE_MODE == "DUMMY":
+        print("[SKIP] Dummy ML service does not parse dates")
+        return True
+    
+    try:
+        csv_path = Path(__file__).parent.parent.parent / "ml" / "saas_billing_train.csv"
+        df = pd.read_csv(csv_path).head(100)
+        
+        # Same dates with a time of day; day differences are unchanged
+        df_timed = df.copy()
+        df_timed['payment_date'] = df['payment_date'] + " 10:00:00"
+        
+        service = get_ml_service()
+        _, X, _ = service.preprocess_data(df)
+        df_clean, X_timed, _ = service.preprocess_data(df_timed)
+        
+        assert df_clean['payment_date'].notna().sum() == df['payment_date'].notna().sum()
+        assert (X == X_timed).all()
+        
+        print("[OK] Timestamps parsed; date features unchanged")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Date parsing failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_xgboost_scoring():
+    """Test that XGBoost inplace scoring matches predict_proba on an early-stopped model"""
+    print("\n" + "="*60)
+    print("Testing ML Service - XGBoost Scoring")
+    print("="*60)
+    
+    if ML_SERVICE_MODE == "DUMMY":
+        print("[SKIP] Dummy ML service has no scoring function")
+        return True
+    try:
+        import xgboost as xgb
+    except ImportError:
+        print("[SKIP] xgboost not installed")
+        return True
+    
+    try:
+        from types import SimpleNamespace
+        import numpy as np
+        from ml_service.ml_service import MLService
+        
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(2000, 8)).astype(np.float32)
+        y = (X[:, 0] + rng.normal(scale=1.5, size=2000) > 0).astype(int)
+        X[rng.random(X.shape) < 0.05] = -999.0
+        
+        # Noisy labels make early stopping pick an iteration well before the last
+        model = xgb.XGBClassifier(
+            n_estimators=300, learning_rate=0.3, early_stopping_rounds=5, missing=-999.0
+        )
+        model.fit(X[:1500], y[:1500], eval_set=[(X[1500:], y[1500:])], verbose=False)
+        assert model.best_iteration < 299
+        
+        scoring_fn = MLService._build_scoring_fn(SimpleNamespace(supervised_model=model))
+        expected = model.predict_proba(X)[:, 1]
+        assert np.allclose(scoring_fn(X), expected, atol=1e-6)
+        
+        print(f"[OK] Scores match predict_proba (best iteration {model.best_iteration})")
+        return True
+    except Exception as e:
+        print(f"[FAIL] XGBoost scoring failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 if __name__ == "__main__":
     print("\n[TEST] Starting ML Service Tests\n")
     
@@ -102,6 +181,8 @@ if __name__ == "__main__":
     results.append(("Model Loading", test_model_loading()))
     results.append(("Preprocessing", test_preprocessing()))
     results.append(("Anomaly Detection", test_anomaly_detection()))
+    results.append(("Date Columns With Time", test_datetime_columns()))
+    results.append(("XGBoost Scoring", test_xgboost_scoring()))
     
     # Summary
     print("\n" + "="*60)
@@ -0,0 +1,115 @@
+"""
+Test script for anomaly persistence
+Run this to verify detected anomalies can be written to the JSONB columns
+"""
+import sys
+import json
+import uuid
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from ml_service import get_ml_service
+from ml_service.persistence import build_anomaly_rows
+
+
+def test_detected_anomaly_rows():
+    """Test that detect_anomalies output builds JSON-safe rows"""
+    print("="*60)
+    print("Testing Persistence - Rows From Detected Anomalies")
+    print("="*60)
+
+    try:
+        # Load sample data; empty cells and parsed dates reach feature_values
+        csv_path = Path(__file__).parent.parent.parent / "ml" / "saas_billing_train.csv"
+        df = pd.read_csv(csv_path).head(500)
+
+        service = get_ml_service()
+        df_clean, X, feature_names = service.preprocess_data(df)
+        anomalies = service.detect_anomalies(df_clean, X, threshold=0.5)
+
+        rows = build_anomaly_rows(uuid.uuid4(), anomalies)
+        assert len(rows) == len(anomalies)
+
+        for row in rows:
+            # allow_nan=False rejects the NaN token PostgreSQL can't parse
+            json.dumps(row["feature_values"], allow_nan=False)
+
+        print(f"[OK] {len(rows)} rows serialize as strict JSON")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Building rows failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_feature_value_conversion():
+    """Test that timestamps, numpy scalars, and missing values are converted"""
+    print("\n" + "="*60)
+    print("Testing Persistence - Feature Value Conversion")
+    print("="*60)
+
+    try:
+        anomaly = {
+            "row_index": 0,
+            "anomaly_score": 0.9,
+            "severity": "high",
+            "feature_values": {
+                "start_date": pd.Timestamp("2024-01-31"),
+                "end_date": pd.NaT,
+                "amount": np.float64("nan"),
+                "seats": np.int64(3),
+                "plan": "pro",
+            },
+        }
+
+        row = build_anomaly_rows(str(uuid.uuid4()), [anomaly])[0]
+
+        assert row["feature_values"] == {
+            "start_date": "2024-01-31T00:00:00",
+            "end_date": None,
+            "amount": None,
+            "seats": 3,
+            "plan": "pro",
+        }
+        json.dumps(row["feature_values"], allow_nan=False)
+
+        print("[OK] Feature values converted to JSON-native types")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Feature value conversion failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    print("\n[TEST] Starting Persistence Tests\n")
+
+    results = []
+
+    # Run tests
+    results.append(("Detected Anomaly Rows", test_detected_anomaly_rows()))
+    results.append(("Feature Value Conversion", test_feature_value_conversion()))
+
+    # Summary
+    print("\n" + "="*60)
+    print("Test Summary")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "[OK] PASS" if passed else "[FAIL] FAIL"
+        print(f"{status} - {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n[SUCCESS] All tests passed! Anomalies are ready to persist.")
+    else:
+        print("\n[WARN] Some tests failed. Please check the errors above.")
+
+    sys.exit(0 if all_passed else 1)
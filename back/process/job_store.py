@@ -0,0 +1,161 @@
+"""
+Processing job state storage
+Keeps job status outside the request handlers so every API worker sees the
+same jobs: Redis when REDIS_URL is set, an in-process dict otherwise
+"""
+import os
+from datetime import datetime
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+# Store configuration
+REDIS_URL = os.getenv("REDIS_URL", "")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+
+
+class JobState(BaseModel):
+    """State of one processing job"""
+    upload_id: str
+    status: Literal["queued", "processing", "completed", "failed"] = "queued"
+    progress: int = 0
+    anomalies_found: int = 0
+    processing_time: float = 0.0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    error_message: str = ""
+
+
+class InMemoryJobStore:
+    """Job store backed by a dict; only valid for a single API worker"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobState] = {}
+
+    async def create(self, job_id: str, job: JobState):
+        """
+        Store a new job
+
+        Args:
+            job_id: UUID of the processing job
+            job: Initial job state
+        """
+        self._jobs[job_id] = job
+
+    async def get(self, job_id: str) -> Optional[JobState]:
+        """
+        Get a job's current state
+
+        Args:
+            job_id: UUID of the processing job
+
+        Returns:
+            Job state, or None if the job doesn't exist
+        """
+        return self._jobs.get(job_id)
+
+    async def update(self, job_id: str, **fields):
+        """
+        Update some fields of a job
+
+        Args:
+            job_id: UUID of the processing job
+            **fields: JobState fields to overwrite
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            self._jobs[job_id] = job.model_copy(update=fields)
+
+
+class RedisJobStore:
+    """Job store backed by one Redis hash per job, shared by all API workers"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = JOB_TTL_SECONDS):
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    async def create(self, job_id: str, job: JobState):
+        """
+        Store a new job, expiring after JOB_TTL_SECONDS
+
+        Args:
+            job_id: UUID of the processing job
+            job: Initial job state
+        """
+        key = self._key(job_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self._to_hash(job.model_dump(mode="json")))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[JobState]:
+        """
+        Get a job's current state
+
+        Args:
+            job_id: UUID of the processing job
+
+        Returns:
+            Job state, or None if the job doesn't exist or its hash is incomplete
+        """
+        fields = await self.redis.hgetall(self._key(job_id))
+        if not fields:
+            return None
+        try:
+            return JobState.model_validate(fields)
+        except ValidationError:
+            return None
+
+    async def update(self, job_id: str, **fields):
+        """
+        Update some fields of a job; a job that has expired stays gone
+
+        Args:
+            job_id: UUID of the processing job
+            **fields: JobState fields to overwrite
+        """
+        key = self._key(job_id)
+        mapping = self._to_hash(fields)
+
+        async def write_if_exists(pipe):
+            # HSET on a missing key would recreate a partial hash without a TTL;
+            # WATCH retries the check if the key changes or expires before EXEC
+            if not await pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, mapping=mapping)
+
+        await self.redis.transaction(write_if_exists, key)
+
+    @staticmethod
+    def _to_hash(fields: Dict) -> Dict[str, str]:
+        """Redis hashes hold strings; JobState parses them back on read"""
+        return {
+            name: value.isoformat() if isinstance(value, datetime) else str(value)
+            for name, value in fields.items()
+        }
+
+
+# Singleton instance, created on first use
+_job_store = None
+
+
+def get_job_store():
+    """Get the job store singleton: Redis if REDIS_URL is set, in-memory otherwise"""
+    global _job_store
+    if _job_store is None:
+        if REDIS_URL and REDIS_AVAILABLE:
+            _job_store = RedisJobStore()
+        else:
+            _job_store = InMemoryJobStore()
+    return _job_store
@@ -5,11 +5,9 @@ import uuid
 import asyncio
 from datetime import datetime
 
-router = APIRouter()
-
+from process.job_store import JobState, get_job_store
 
-# In-memory job storage (replace with database in production)
-job_storage = {}
+router = APIRouter()
 
 
 class ProcessResponse(BaseModel):
@@ -51,15 +49,7 @@ async def start_processing(upload_id: str):
     job_id = str(uuid.uuid4())
     
     # Initialize job in storage
-    job_storage[job_id] = {
-        "upload_id": upload_id,
-        "status": "queued",
-        "progress": 0,
-        "anomalies_found": 0,
-        "processing_time": 0.0,
-        "created_at": datetime.utcnow(),
-        "error_message": ""
-    }
+    await get_job_store().create(job_id, JobState(upload_id=upload_id))
     
     # TODO: Start async processing (use Celery or background tasks in production)
     # Example:
@@ -88,21 +78,21 @@ async def get_job_status(job_id: str):
     Returns:
         JobStatusResponse: Current job status and results
     """
+    job = await get_job_store().get(job_id)
+    
     # Check if job exists
-    if job_id not in job_storage:
+    if job is None:
         raise HTTPException(
             status_code=404, 
             detail=f"Job {job_id} not found"
         )
     
-    job = job_storage[job_id]
-    
     return JobStatusResponse(
-        status=job["status"],
-        progress=job["progress"],
-        anomalies_found=job["anomalies_found"],
-        processing_time=job["processing_time"],
-        error_message=job.get("error_message", "")
+        status=job.status,
+        progress=job.progress,
+        anomalies_found=job.anomalies_found,
+        processing_time=job.processing_time,
+        error_message=job.error_message
     )
 
 
@@ -123,9 +113,9 @@ async def _simulate_ml_processing(job_id: str):
     6. SHAP value computation
     7. Store results in database
     """
+    job_store = get_job_store()
     try:
-        job = job_storage[job_id]
-        job["status"] = "processing"
+        await job_store.update(job_id, status="processing")
         
         # Simulate processing steps with progress updates
         stages = [
@@ -140,25 +130,31 @@ async def _simulate_ml_processing(job_id: str):
         
         for stage_name, progress in stages:
             await asyncio.sleep(1)  # Simulate processing time
-            job["progress"] = progress
+            await job_store.update(job_id, progress=progress)
         
         # Simulate completed results
         end_time = datetime.utcnow()
         processing_time = (end_time - start_time).total_seconds()
         
-        job["status"] = "completed"
-        job["progress"] = 100
-        job["anomalies_found"] = 23  # TODO: Replace with actual ML results
-        job["processing_time"] = processing_time
+        await job_store.update(
+            job_id,
+            status="completed",
+            progress=100,
+            anomalies_found=23,  # TODO: Replace with actual ML results
+            processing_time=processing_time
+        )
         
         # TODO: Store results in database
         # await db.save_anomaly_results(job_id, anomalies)
         
     except Exception as e:
         # Handle processing errors
-        job["status"] = "failed"
-        job["error_message"] = str(e)
-        job["progress"] = 0
+        await job_store.update(
+            job_id,
+            status="failed",
+            error_message=str(e),
+            progress=0
+        )
 
 
 # ========================================
@@ -167,7 +163,7 @@ async def _simulate_ml_processing(job_id: str):
 """
 For production deployment:
 
-1. Replace in-memory job_storage with Redis or database
+1. Set REDIS_URL so job state (process/job_store.py) is shared by all workers
 2. Use Celery for async task processing:
    @celery_app.task
    def process_ml_job(job_id, upload_id):
@@ -0,0 +1,120 @@
+"""
+Test script for the processing job store
+Run this to verify job state round-trips and expired jobs stay gone
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from process.job_store import InMemoryJobStore, JobState, RedisJobStore
+
+try:
+    import fakeredis
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    FAKEREDIS_AVAILABLE = False
+
+
+async def _round_trip(store) -> JobState:
+    """Create a job, update it, and read it back"""
+    await store.create("job-1", JobState(upload_id="upload-1"))
+    await store.update("job-1", status="completed", progress=100, processing_time=1.5)
+    return await store.get("job-1")
+
+
+def test_in_memory_store():
+    """Test create/update/get on the in-memory store"""
+    print("="*60)
+    print("Testing Job Store - In Memory")
+    print("="*60)
+
+    try:
+        store = InMemoryJobStore()
+        job = asyncio.run(_round_trip(store))
+
+        assert job.upload_id == "upload-1"
+        assert (job.status, job.progress, job.processing_time) == ("completed", 100, 1.5)
+
+        # Updating an unknown job doesn't create one
+        asyncio.run(store.update("missing", progress=50))
+        assert asyncio.run(store.get("missing")) is None
+
+        print("[OK] In-memory store round-trips job state")
+        return True
+    except Exception as e:
+        print(f"[FAIL] In-memory store failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_redis_store():
+    """Test the Redis store, including updates after a job expired"""
+    print("\n" + "="*60)
+    print("Testing Job Store - Redis")
+    print("="*60)
+
+    if not FAKEREDIS_AVAILABLE:
+        print("[SKIP] fakeredis not installed")
+        return True
+
+    async def run():
+        store = RedisJobStore(url="redis://localhost:6379/0", ttl=60)
+        store.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+        job = await _round_trip(store)
+        assert job.upload_id == "upload-1"
+        assert (job.status, job.progress, job.processing_time) == ("completed", 100, 1.5)
+        assert 0 < await store.redis.ttl(store._key("job-1")) <= 60
+
+        # An update after expiry must not recreate a partial hash
+        await store.redis.delete(store._key("job-1"))
+        await store.update("job-1", progress=50)
+        assert not await store.redis.exists(store._key("job-1"))
+        assert await store.get("job-1") is None
+
+        # A partial hash left by an older version reads as missing
+        await store.redis.hset(store._key("job-2"), mapping={"progress": "50"})
+        assert await store.get("job-2") is None
+
+    try:
+        asyncio.run(run())
+
+        print("[OK] Redis store round-trips job state and keeps expired jobs gone")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Redis store failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    print("\n[TEST] Starting Job Store Tests\n")
+
+    results = []
+
+    # Run tests
+    results.append(("In-Memory Store", test_in_memory_store()))
+    results.append(("Redis Store", test_redis_store()))
+
+    # Summary
+    print("\n" + "="*60)
+    print("Test Summary")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "[OK] PASS" if passed else "[FAIL] FAIL"
+        print(f"{status} - {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n[SUCCESS] All tests passed! Job store is ready.")
+    else:
+        print("\n[WARN] Some tests failed. Please check the errors above.")
+
+    sys.exit(0 if all_passed else 1)
@@ -0,0 +1,138 @@
+"""
+Test script for CSV upload parsing
+Run this to verify uploaded CSVs parse like they did with pandas
+"""
+import sys
+import io
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd
+from process.upload import _preview_rows, _read_csv_table
+
+
+def test_well_formed_csv():
+    """Test that a regular CSV parses with PyArrow"""
+    print("="*60)
+    print("Testing Upload - Well-Formed CSV")
+    print("="*60)
+
+    try:
+        table = _read_csv_table(io.BytesIO(b"a,b,c\n1,2,3\n4,5,6\n"))
+
+        assert (table.num_rows, table.num_columns) == (2, 3)
+        assert table.column("c").to_pylist() == [3, 6]
+
+        print("[OK] Parsed 2 rows, 3 columns")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Parsing failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_short_rows():
+    """Test that rows with missing trailing fields still parse, as with pandas"""
+    print("\n" + "="*60)
+    print("Testing Upload - Short Rows")
+    print("="*60)
+
+    try:
+        table = _read_csv_table(io.BytesIO(b"a,b,c\n1,2,3\n4,5\n"))
+
+        assert (table.num_rows, table.num_columns) == (2, 3)
+        assert table.column("c").to_pylist() == [3, None]
+
+        print("[OK] Missing fields filled as nulls")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Short rows rejected: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_long_rows():
+    """Test that rows with extra fields are still rejected"""
+    print("\n" + "="*60)
+    print("Testing Upload - Long Rows")
+    print("="*60)
+
+    try:
+        try:
+            _read_csv_table(io.BytesIO(b"a,b,c\n1,2,3\n4,5,6,7\n"))
+        except pd.errors.ParserError:
+            print("[OK] Extra fields rejected")
+            return True
+
+        print("[FAIL] Extra fields were accepted")
+        return False
+    except Exception as e:
+        print(f"[FAIL] Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_preview_values():
+    """Test that the preview keeps dates as text and missing cells as None"""
+    print("\n" + "="*60)
+    print("Testing Upload - Preview Values")
+    print("="*60)
+
+    try:
+        csv = (
+            b"invoice_id,invoice_date,payment_date,failed_reason\n"
+            b"1,2024-10-19,2024-10-20 10:00:00,\n"
+            b"2,2024-10-21,2024-10-22 09:30:00,network_error\n"
+        )
+        expected = [
+            [1, "2024-10-19", "2024-10-20 10:00:00", None],
+            [2, "2024-10-21", "2024-10-22 09:30:00", "network_error"],
+        ]
+
+        # Same preview from PyArrow and from the pandas fallback (short last row)
+        assert _preview_rows(_read_csv_table(io.BytesIO(csv))) == expected
+        ragged = csv + b"3,2024-10-23\n"
+        assert _preview_rows(_read_csv_table(io.BytesIO(ragged)))[:2] == expected
+
+        print("[OK] Dates previewed as text, empty cells as None")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Preview values changed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    print("\n[TEST] Starting Upload Tests\n")
+
+    results = []
+
+    # Run tests
+    results.append(("Well-Formed CSV", test_well_formed_csv()))
+    results.append(("Short Rows", test_short_rows()))
+    results.append(("Long Rows", test_long_rows()))
+    results.append(("Preview Values", test_preview_values()))
+
+    # Summary
+    print("\n" + "="*60)
+    print("Test Summary")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "[OK] PASS" if passed else "[FAIL] FAIL"
+        print(f"{status} - {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n[SUCCESS] All tests passed! CSV parsing is ready.")
+    else:
+        print("\n[WARN] Some tests failed. Please check the errors above.")
+
+    sys.exit(0 if all_passed else 1)
@@ -1,15 +1,67 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Any
-from sqlalchemy.orm import Session
+from typing import List, Any, BinaryIO
+from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
-import io
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 from database import get_db, Upload
 from storage import get_storage_service
+from dashboard.metrics_cache import get_metrics_cache, DASHBOARD_METRICS_CACHE_KEY
 
 router = APIRouter()
 
+# Empty cells in text columns are missing values (as with pandas), not ''
+CSV_CONVERT_OPTIONS = pacsv.ConvertOptions(strings_can_be_null=True)
+
+
+def _read_csv_table(source: BinaryIO) -> pa.Table:
+    """
+    Parse an uploaded CSV into an Arrow table
+    
+    PyArrow rejects rows with a different field count than the header, which
+    pandas accepts when they are short (missing fields become NaN). Those
+    files fall back to pandas so they keep uploading as before.
+    
+    Args:
+        source: Upload's underlying file object, positioned at the start
+        
+    Returns:
+        Parsed table
+    """
+    try:
+        return pacsv.read_csv(source, convert_options=CSV_CONVERT_OPTIONS)
+    except pa.ArrowInvalid as e:
+        if "columns, got" not in str(e):
+            raise
+    
+    source.seek(0)
+    return pa.Table.from_pandas(pd.read_csv(source), preserve_index=False)
+
+
+def _preview_rows(table: pa.Table, num_rows: int = 10) -> List[List[Any]]:
+    """
+    First rows of a parsed CSV as lists of values
+    
+    PyArrow infers date and timestamp columns, which pandas left as text.
+    Those are cast back to strings so the preview shows "2024-10-19" rather
+    than "2024-10-19T00:00:00".
+    
+    Args:
+        table: Parsed CSV table
+        num_rows: Number of rows to include
+        
+    Returns:
+        One list of values per row
+    """
+    columns = [
+        column.cast(pa.string()) if pa.types.is_temporal(column.type) else column
+        for column in table.slice(0, num_rows).columns
+    ]
+    return [list(row) for row in zip(*(column.to_pylist() for column in columns))]
+
 
 class UploadResponse(BaseModel):
     """Response model for file upload"""
@@ -23,7 +75,7 @@ class UploadResponse(BaseModel):
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload a CSV file for leak detection analysis.
@@ -43,21 +95,18 @@ async def upload_file(
         )
     
     try:
-        # Read the file content
-        contents = await file.read()
-        
-        # Parse CSV using pandas
-        df = pd.read_csv(io.BytesIO(contents))
+        # Parse CSV with PyArrow straight from the spooled upload file,
+        # in a worker thread so the event loop keeps serving other requests
+        table = await run_in_threadpool(_read_csv_table, file.file)
         
         # Validate CSV is not empty
-        if df.empty:
+        if table.num_rows == 0:
             raise HTTPException(status_code=400, detail="The uploaded CSV file is empty")
         
         # Get rows and columns count
-        rows, columns = df.shape
+        rows, columns = table.num_rows, table.num_columns
         
-        # Reset file pointer for storage
-        file.file.seek(0)
+        # Rewind after parsing so storage copies the file from the start
         await file.seek(0)
         
         # Save file using storage service
@@ -74,12 +123,14 @@ async def upload_file(
         )
         
         db.add(upload)
-        db.commit()
-        db.refresh(upload)
+        await db.commit()
+        await db.refresh(upload)
+        
+        # New samples change the dashboard totals
+        get_metrics_cache().invalidate(DASHBOARD_METRICS_CACHE_KEY)
         
         # Get preview (first 10 rows as list of lists)
-        preview_df = df.head(10)
-        preview = preview_df.values.tolist()
+        preview = _preview_rows(table)
         
         print(f"✅ Upload successful: {upload.id} - {file.filename} ({rows} rows)")
         
@@ -91,11 +142,15 @@ async def upload_file(
             preview=preview
         )
         
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="The uploaded CSV file is empty")
+    except HTTPException:
+        raise
+    except pa.ArrowInvalid as e:
+        if "Empty CSV file" in str(e):
+            raise HTTPException(status_code=400, detail="The uploaded CSV file is empty")
+        raise HTTPException(status_code=400, detail="Invalid CSV file format")
     except pd.errors.ParserError:
         raise HTTPException(status_code=400, detail="Invalid CSV file format")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"❌ Upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
\ No newline at end of file
@@ -3,29 +3,174 @@ File storage service
 Handles file uploads and retrieval for the Leak Detector application
 """
 import os
-import uuid
-import aiofiles
+import contextlib
+import functools
+import logging
+import re
+import time
+import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 from fastapi import UploadFile
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 # Storage configuration
 STORAGE_BASE_DIR = Path(__file__).parent.parent.parent / "data" / "uploads"
 MAX_FILE_SIZE_MB = 100  # Maximum upload size in MB
+_MAX_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20  # Bytes read from the upload per read (1 MiB)
+WRITE_FLUSH_SIZE = 4 << 20  # Bytes buffered before each disk write (4 MiB)
+STORAGE_STATS_TTL_SECONDS = 2.0  # How long a directory scan answers repeated stats polls
+
+# Uploads are always new files; O_EXCL refuses to overwrite an existing one
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+# Fresh names tried when a generated filename already exists
+UNIQUE_FILENAME_ATTEMPTS = 3
+
+# Local-time stamp embedded in stored filenames
+FILENAME_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Anything but alphanumeric, dots, hyphens, and underscores is stripped from filenames
+_DISALLOWED_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _copy_upload(
+    source: BinaryIO,
+    file_path: Path,
+    max_size_bytes: int,
+    dir_fd: Optional[int] = None
+) -> int:
+    """
+    Copy an upload stream to a new file, enforcing the size limit as bytes arrive
+    Blocking; run it off the event loop. A partially written file is removed on error
+    
+    Args:
+        source: Upload's underlying file object
+        file_path: Destination path (must not exist yet)
+        max_size_bytes: Largest accepted upload
+        dir_fd: Open descriptor of file_path's directory; the file is then
+            created relative to it, skipping the full path lookup
+        
+    Returns:
+        Number of bytes written
+        
+    Raises:
+        ValueError: If the upload exceeds max_size_bytes
+        FileExistsError: If file_path already exists
+    """
+    name = file_path.name if dir_fd is not None else file_path
+    fd = os.open(name, _CREATE_FLAGS, 0o644, dir_fd=dir_fd)
+    
+    try:
+        with os.fdopen(fd, 'wb', buffering=WRITE_FLUSH_SIZE) as out:
+            # Uploads spooled to disk are copied in the kernel, without passing
+            # through Python buffers; fall back to the read/write loop otherwise
+            src_fd = _disk_fileno(source)
+            if src_fd is not None:
+                file_size = _copy_file_range(src_fd, source.tell(), fd, max_size_bytes)
+                if file_size is not None:
+                    return file_size
+            
+            file_size = 0
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > max_size_bytes:
+                    raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB")
+                out.write(chunk)
+        return file_size
+    except BaseException:
+        # Single unlink, no exists() probe; tolerate the file already being gone
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(name, dir_fd=dir_fd)
+        raise
+
+
+def _disk_fileno(source: BinaryIO) -> Optional[int]:
+    """
+    Get the descriptor of an upload that already lives on disk
+    
+    Args:
+        source: Upload's underlying file object
+        
+    Returns:
+        File descriptor, or None for in-memory uploads and platforms
+        without copy_file_range
+    """
+    if not hasattr(os, "copy_file_range"):
+        return None
+    # SpooledTemporaryFile.fileno() would force an in-memory upload onto disk
+    if not getattr(source, "_rolled", True):
+        return None
+    try:
+        return source.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+def _copy_file_range(src_fd: int, src_offset: int, dst_fd: int, max_size_bytes: int) -> Optional[int]:
+    """
+    Copy the rest of a file from src_offset into dst_fd inside the kernel
+    
+    Args:
+        src_fd: Source descriptor
+        src_offset: Position in the source to copy from
+        dst_fd: Destination descriptor, positioned at its start
+        max_size_bytes: Largest accepted upload
+        
+    Returns:
+        Number of bytes copied, or None if the kernel or filesystem can't
+        copy between these files and nothing was copied
+        
+    Raises:
+        ValueError: If the upload exceeds max_size_bytes
+    """
+    file_size = os.fstat(src_fd).st_size - src_offset
+    if file_size > max_size_bytes:
+        raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB")
+    
+    copied = 0
+    while copied < file_size:
+        try:
+            n = os.copy_file_range(src_fd, dst_fd, file_size - copied, src_offset + copied)
+        except OSError:
+            if copied:
+                raise
+            return None
+        if n == 0:
+            break
+        copied += n
+    return copied
 
 
 class StorageService:
     """Handles file upload and storage operations"""
     
-    def __init__(self, base_dir: Path = STORAGE_BASE_DIR):
-        self.base_dir = base_dir
+    def __init__(self, base_dir: Optional[Path] = None):
+        # STORAGE_BASE_DIR is read here, not at class definition, so it can
+        # still be configured before the first get_storage_service() call
+        self.base_dir = base_dir if base_dir is not None else STORAGE_BASE_DIR
         self._ensure_directory_exists()
+        # (monotonic timestamp, stats) of the last directory scan
+        self._stats_cache = (0.0, None)
     
     def _ensure_directory_exists(self):
-        """Create storage directory if it doesn't exist"""
+        """Create storage directory if it doesn't exist and keep it open"""
         self.base_dir.mkdir(parents=True, exist_ok=True)
-        print(f"📁 Storage directory: {self.base_dir}")
+        logger.info("Storage directory: %s", self.base_dir)
+        
+        # New uploads are created relative to this descriptor (openat) where supported
+        self._dir_fd = None
+        if os.open in os.supports_dir_fd:
+            self._dir_fd = os.open(self.base_dir, _DIR_FLAGS)
+    
+    def close(self):
+        """Release the storage directory descriptor"""
+        if self._dir_fd is not None:
+            os.close(self._dir_fd)
+            self._dir_fd = None
     
     def _sanitize_filename(self, filename: str) -> str:
         """
@@ -40,18 +185,14 @@ class StorageService:
         # Remove any path components
         filename = os.path.basename(filename)
         
-        # Replace spaces and special characters
-        filename = filename.replace(" ", "_")
-        
-        # Keep only alphanumeric, dots, hyphens, and underscores
-        allowed_chars = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-")
-        filename = "".join(c for c in filename if c in allowed_chars)
+        # Replace spaces, then keep only alphanumeric, dots, hyphens, and underscores
+        filename = _DISALLOWED_FILENAME_CHARS.sub("", filename.replace(" ", "_"))
         
         return filename
     
     def _generate_unique_filename(self, original_filename: str) -> str:
         """
-        Generate unique filename with timestamp and UUID
+        Generate unique filename with timestamp and random suffix
         
         Args:
             original_filename: Original filename with extension
@@ -59,27 +200,14 @@ class StorageService:
         Returns:
             Unique filename
         """
-        # Split filename and extension
-        name_parts = original_filename.rsplit(".", 1)
-        if len(name_parts) == 2:
-            name, ext = name_parts
-        else:
-            name = original_filename
-            ext = ""
-        
-        # Sanitize name
-        name = self._sanitize_filename(name)
-        
-        # Create unique filename: name_timestamp_uuid.ext
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        
-        if ext:
-            unique_filename = f"{name}_{timestamp}_{unique_id}.{ext}"
-        else:
-            unique_filename = f"{name}_{timestamp}_{unique_id}"
-        
-        return unique_filename
+        # Sanitize, then split off the extension (ext keeps its dot, or is "")
+        name, ext = os.path.splitext(self._sanitize_filename(original_filename))
+        
+        # Create unique filename: name_timestamp_randomhex.ext
+        timestamp = time.strftime(FILENAME_TIMESTAMP_FORMAT)
+        unique_id = os.urandom(4).hex()
+        
+        return f"{name}_{timestamp}_{unique_id}{ext}"
     
     async def save_file(self, file: UploadFile) -> tuple[str, int]:
         """
@@ -94,52 +222,56 @@ class StorageService:
         Raises:
             ValueError: If file is too large or invalid
         """
-        # Check file size
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Reset to beginning
-        
-        max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
-        if file_size > max_size_bytes:
-            raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB")
-        
-        # Generate unique filename
-        unique_filename = self._generate_unique_filename(file.filename)
-        file_path = self.base_dir / unique_filename
-        
-        # Save file asynchronously
+        # Copy the upload to disk in a single worker thread: one thread hop
+        # for the whole file instead of one per chunk
         try:
-            async with aiofiles.open(file_path, 'wb') as f:
-                contents = await file.read()
-                await f.write(contents)
+            for attempt in range(UNIQUE_FILENAME_ATTEMPTS):
+                # Generate unique filename; O_EXCL makes a name collision fail
+                # before anything is read, so a fresh name can simply be tried
+                unique_filename = self._generate_unique_filename(file.filename)
+                file_path = self.base_dir / unique_filename
+                try:
+                    file_size = await asyncio.to_thread(
+                        _copy_upload, file.file, file_path, _MAX_SIZE_BYTES, self._dir_fd
+                    )
+                    break
+                except FileExistsError:
+                    if attempt == UNIQUE_FILENAME_ATTEMPTS - 1:
+                        raise
             
-            print(f"✅ File saved: {file_path}")
+            logger.info("File saved: %s", file_path)
+            self._stats_cache = (0.0, None)
             return str(file_path), file_size
             
         except Exception as e:
-            print(f"❌ Error saving file: {e}")
-            # Clean up partial file if it exists
-            if file_path.exists():
-                file_path.unlink()
+            logger.error("Error saving file: %s", e)
             raise e
     
-    def get_file_path(self, upload_id: str, filename: str) -> Optional[Path]:
+    def get_file_path(self, upload_id: str, filename: str, check: bool = False) -> Optional[Path]:
         """
         Get file path for a given upload_id
         
+        Only the final component of filename is used and it is resolved inside
+        the storage directory, so a stored path can't point anywhere else.
+        
         Args:
-            upload_id: UUID of the upload
-            filename: Stored filename
+            upload_id: UUID of the upload (stored names don't embed it)
+            filename: Stored filename or path, as returned by save_file
+            check: Verify the file exists; callers that open the file
+                right away can skip this and handle FileNotFoundError
             
         Returns:
-            Path object if file exists, None otherwise
+            Path object, or None if check is set and the file doesn't exist
         """
-        file_path = Path(filename)
+        file_path = self.base_dir / os.path.basename(filename)
         
-        if file_path.exists():
-            return file_path
+        if check:
+            try:
+                os.stat(file_path)
+            except FileNotFoundError:
+                return None
         
-        return None
+        return file_path
     
     def delete_file(self, file_path: str) -> bool:
         """
@@ -152,44 +284,51 @@ class StorageService:
             True if deleted successfully, False otherwise
         """
         try:
-            path = Path(file_path)
-            if path.exists():
-                path.unlink()
-                print(f"🗑️ File deleted: {file_path}")
-                return True
+            Path(file_path).unlink()
+        except FileNotFoundError:
             return False
         except Exception as e:
-            print(f"❌ Error deleting file: {e}")
+            logger.error("Error deleting file: %s", e)
             return False
+        
+        logger.info("File deleted: %s", file_path)
+        self._stats_cache = (0.0, None)
+        return True
     
     def get_storage_stats(self) -> dict:
         """
         Get storage statistics
         
         Returns:
-            Dictionary with storage info
+            Dictionary with storage info (cached for STORAGE_STATS_TTL_SECONDS)
         """
-        if not self.base_dir.exists():
-            return {
-                "total_files": 0,
-                "total_size_mb": 0,
-                "storage_path": str(self.base_dir)
-            }
-        
-        files = list(self.base_dir.iterdir())
-        total_size = sum(f.stat().st_size for f in files if f.is_file())
-        
-        return {
-            "total_files": len(files),
+        cached_at, cached_stats = self._stats_cache
+        if cached_stats is not None and time.monotonic() - cached_at < STORAGE_STATS_TTL_SECONDS:
+            return dict(cached_stats)
+        
+        # One readdir pass: DirEntry caches the file type and stat info
+        total_files = 0
+        total_size = 0
+        try:
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        total_files += 1
+                        total_size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+        
+        stats = {
+            "total_files": total_files,
             "total_size_mb": round(total_size / (1024 * 1024), 2),
             "storage_path": str(self.base_dir)
         }
+        self._stats_cache = (time.monotonic(), stats)
+        
+        return dict(stats)
 
 
-# Singleton instance
-storage_service = StorageService()
-
-
+@functools.lru_cache(maxsize=1)
 def get_storage_service() -> StorageService:
-    """Get the storage service singleton instance"""
-    return storage_service
+    """Get the storage service singleton instance, created on first use"""
+    return StorageService()
@@ -0,0 +1,232 @@
+"""
+Test script for the storage service
+Run this to verify uploads are copied to disk safely
+"""
+import sys
+import os
+import errno
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import UploadFile
+from storage import storage
+from storage.storage import StorageService, _copy_upload, _disk_fileno
+
+PAYLOAD = os.urandom(256 * 1024)
+
+
+def _spooled_upload(rolled: bool) -> tempfile.SpooledTemporaryFile:
+    """Upload body as Starlette spools it: in memory, or rolled over to disk"""
+    source = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    source.write(PAYLOAD)
+    if rolled:
+        source.rollover()
+    source.seek(0)
+    return source
+
+
+def _save(service: StorageService, source) -> tuple:
+    """Run save_file on an UploadFile wrapping source"""
+    return asyncio.run(service.save_file(UploadFile(source, filename="billing data.csv")))
+
+
+def test_spooled_uploads():
+    """Test that in-memory and rolled-over uploads are both copied intact"""
+    print("="*60)
+    print("Testing Storage - In-Memory and Rolled-Over Uploads")
+    print("="*60)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = StorageService(Path(tmp))
+            try:
+                for rolled in (False, True):
+                    source = _spooled_upload(rolled)
+
+                    # Probing an in-memory spool must not force it onto disk
+                    fd = _disk_fileno(source)
+                    assert (fd is not None) == (rolled and hasattr(os, "copy_file_range"))
+                    assert source._rolled == rolled
+
+                    file_path, file_size = _save(service, source)
+                    assert file_size == len(PAYLOAD)
+                    assert Path(file_path).read_bytes() == PAYLOAD
+                    assert Path(file_path).parent == Path(tmp)
+                    assert Path(file_path).name.startswith("billing_data_")
+            finally:
+                service.close()
+
+        print("[OK] Both spool states copied byte for byte")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Spooled upload copy failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_over_limit_upload():
+    """Test that an upload over the size limit leaves no file behind"""
+    print("\n" + "="*60)
+    print("Testing Storage - Over-Limit Uploads")
+    print("="*60)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rolled in (False, True):
+                file_path = Path(tmp) / f"too_big_{rolled}.csv"
+                try:
+                    _copy_upload(_spooled_upload(rolled), file_path, len(PAYLOAD) - 1)
+                except ValueError:
+                    pass
+                else:
+                    raise AssertionError("upload over the limit was accepted")
+            assert os.listdir(tmp) == []
+
+        print("[OK] Over-limit uploads rejected and removed")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Over-limit upload check failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_copy_file_range_fallback():
+    """Test that a rolled-over upload falls back to read/write when the kernel copy fails"""
+    print("\n" + "="*60)
+    print("Testing Storage - copy_file_range Fallback")
+    print("="*60)
+
+    if not hasattr(os, "copy_file_range"):
+        print("[SKIP] os.copy_file_range not available on this platform")
+        return True
+
+    def unsupported(*args, **kwargs):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    original = os.copy_file_range
+    os.copy_file_range = unsupported
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = Path(tmp) / "fallback.csv"
+            file_size = _copy_upload(_spooled_upload(rolled=True), file_path, len(PAYLOAD))
+            assert file_size == len(PAYLOAD)
+            assert file_path.read_bytes() == PAYLOAD
+
+        print("[OK] Read/write loop used when copy_file_range fails")
+        return True
+    except Exception as e:
+        print(f"[FAIL] copy_file_range fallback failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        os.copy_file_range = original
+
+
+def test_filename_collision_retry():
+    """Test that a taken filename is never overwritten and a fresh one is tried"""
+    print("\n" + "="*60)
+    print("Testing Storage - Filename Collision Retry")
+    print("="*60)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = StorageService(Path(tmp))
+            try:
+                taken = Path(tmp) / "taken.csv"
+                taken.write_bytes(b"existing")
+
+                # First generated name collides, the second is free
+                names = iter(["taken.csv", "fresh.csv"])
+                service._generate_unique_filename = lambda filename: next(names)
+                file_path, _ = _save(service, _spooled_upload(rolled=False))
+                assert Path(file_path).name == "fresh.csv"
+                assert Path(file_path).read_bytes() == PAYLOAD
+
+                # Every attempt collides: the error surfaces, nothing is overwritten
+                service._generate_unique_filename = lambda filename: "taken.csv"
+                try:
+                    _save(service, _spooled_upload(rolled=False))
+                except FileExistsError:
+                    pass
+                else:
+                    raise AssertionError("colliding name was overwritten")
+                assert taken.read_bytes() == b"existing"
+                assert sorted(os.listdir(tmp)) == ["fresh.csv", "taken.csv"]
+            finally:
+                service.close()
+
+        print(f"[OK] Collisions retried up to {storage.UNIQUE_FILENAME_ATTEMPTS} times")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Collision retry failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_configured_base_dir():
+    """Test that STORAGE_BASE_DIR set before first use is honoured"""
+    print("\n" + "="*60)
+    print("Testing Storage - Configured Base Directory")
+    print("="*60)
+
+    original = storage.STORAGE_BASE_DIR
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage.STORAGE_BASE_DIR = Path(tmp) / "uploads"
+            storage.get_storage_service.cache_clear()
+            service = storage.get_storage_service()
+            try:
+                assert service.base_dir == Path(tmp) / "uploads"
+                assert service.base_dir.is_dir()
+            finally:
+                service.close()
+
+        print("[OK] Storage directory read on first use")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Configured base directory ignored: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        storage.STORAGE_BASE_DIR = original
+        storage.get_storage_service.cache_clear()
+
+
+if __name__ == "__main__":
+    print("\n[TEST] Starting Storage Tests\n")
+
+    results = []
+
+    # Run tests
+    results.append(("Spooled Uploads", test_spooled_uploads()))
+    results.append(("Over-Limit Upload", test_over_limit_upload()))
+    results.append(("copy_file_range Fallback", test_copy_file_range_fallback()))
+    results.append(("Filename Collision Retry", test_filename_collision_retry()))
+    results.append(("Configured Base Directory", test_configured_base_dir()))
+
+    # Summary
+    print("\n" + "="*60)
+    print("Test Summary")
+    print("="*60)
+
+    for test_name, passed in results:
+        status = "[OK] PASS" if passed else "[FAIL] FAIL"
+        print(f"{status} - {test_name}")
+
+    all_passed = all(result[1] for result in results)
+
+    if all_passed:
+        print("\n[SUCCESS] All tests passed! Storage is ready.")
+    else:
+        print("\n[WARN] Some tests failed. Please check the errors above.")
+
+    sys.exit(0 if all_passed else 1)